@@ -0,0 +1,142 @@
+"""
+This file contains the functions necessary for
+keeping the products derived from every session (gaze arrays, microsaccades, epochs)
+on disk, so they are only computed again when their input or parameters change.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+MAX_CACHE_SIZE = 10e9  # in bytes, least recently used entries are removed above this
+HASH_CHUNK_SIZE = 2**20  # bytes read at once when hashing a file
+
+
+class Cache:
+    """
+    usage:
+
+       cache = Cache(os.path.join(directory, "cache"))
+       key, entry = cache.fetch("gaze", [cache.file_hash(path)], {"eye": "RIGHT"}, compute)
+
+    Every product is saved in its own directory (`entry`), named after the hash
+    (`key`) of its stage, inputs and parameters. `compute(entry)` is only called
+    to fill that directory if it doesn't exist yet. The key of one stage is used
+    as input of the next, so changing a parameter only recomputes the stages after it.
+
+    Entries are never removed while fetching, as another process (or the next stage)
+    may be about to load them. Call `evict` once nothing uses the cache anymore.
+    """
+
+    def __init__(self, directory, max_size=MAX_CACHE_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.computed = []
+        os.makedirs(os.path.join(directory, "hashes"), exist_ok=True)
+
+    def file_hash(self, path):
+        """
+        Hash of the contents of a file, remembered as long as the file isn't changed.
+        """
+        status = os.stat(path)
+        remembered = os.path.join(
+            self.directory,
+            "hashes",
+            _hash(os.path.abspath(path), status.st_size, status.st_mtime_ns),
+        )
+
+        if os.path.exists(remembered):
+            with open(remembered) as file:
+                return file.read()
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+
+        _write_atomically(remembered, digest.hexdigest())
+        return digest.hexdigest()
+
+    def fetch(self, stage, inputs, parameters, compute, force=False):
+        """
+        The key and directory of a product, computing it first if it isn't cached
+        (or if `force`).
+        """
+        key = _hash(stage, *inputs, json.dumps(parameters, sort_keys=True))
+        entry = os.path.join(self.directory, stage, key)
+
+        if os.path.isdir(entry) and not force:
+            # Mark as recently used
+            os.utime(entry)
+            return key, entry
+
+        # Compute next to the cache entry, so other processes never see half of it
+        temporary = f"{entry}.{os.getpid()}.tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        compute(temporary)
+        self.computed.append(stage)
+
+        with open(os.path.join(temporary, "parameters.json"), "w") as file:
+            json.dump({"stage": stage, "inputs": inputs, "parameters": parameters}, file)
+
+        if force:
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            # Another process was faster
+            shutil.rmtree(temporary, ignore_errors=True)
+
+        return key, entry
+
+    def size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in `max_size`.
+        Only call this when no other process is using the cache.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+
+        for _, entry, size in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def _entries(self):
+        # (last used, directory, size in bytes) of every entry
+        entries = []
+        for stage in os.scandir(self.directory):
+            if not stage.is_dir() or stage.name == "hashes":
+                continue
+
+            for entry in os.scandir(stage.path):
+                if entry.is_dir() and not entry.name.endswith(".tmp"):
+                    entries.append(
+                        (entry.stat().st_mtime, entry.path, _directory_size(entry.path))
+                    )
+
+        return entries
+
+
+def _hash(*values):
+    return hashlib.sha256("\n".join(str(value) for value in values).encode()).hexdigest()
+
+
+def _directory_size(directory):
+    return sum(file.stat().st_size for file in os.scandir(directory) if file.is_file())
+
+
+def _write_atomically(path, text):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as file:
+        file.write(text)
+    os.replace(temporary, path)
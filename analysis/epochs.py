@@ -0,0 +1,223 @@
+"""
+This file contains the functions necessary for
+cutting the gaze of a session into epochs around the eyetracker triggers,
+and matching those to the trials in the data_session_N.csv.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+import pandas as pd
+
+RESUMED = "resumed after trial"  # message sent when a session is continued after a crash
+TRIAL_ID = "TRIALID"  # message sent at the start of every trial, with its number
+
+# First digit of every trigger, see eyetracker.get_trigger
+EVENTS = {
+    "stimulus_onset_1": 1,
+    "stimulus_onset_2": 2,
+    "cue_onset": 3,
+    "response_onset": 4,
+    "response_offset": 5,
+    "feedback_onset": 6,
+}
+
+
+class Epochs:
+    """
+    usage:
+
+       epochs = Epochs(gaze["x"], gaze["time"], event_times, (-500, 1500), gaze["rate"])
+       epochs[0]  # the first epoch, a view on the gaze (nothing is copied)
+
+    The epochs of one signal, from `window[0]` up to `window[1]` ms around every event,
+    cut by the time of the samples, so an epoch never takes samples from another time
+    across a gap in the recording (e.g. where it was resumed or calibrated again).
+    Indexing gives only the samples recorded within an epoch (so it's shorter, or empty,
+    near the edges of the recording or around a gap). Epochs that have a sample for
+    every `1000 / rate` ms are `complete`. Use `to_array` to get them all in one
+    (copied) 2D array, every sample at its time and padded with NaN where there's none.
+    """
+
+    def __init__(self, signal, time, event_times, window, rate) -> None:
+        self.signal = signal
+        self.time = time
+        self.event_times = np.asarray(event_times)
+        self.window = window
+        self.rate = rate
+        self.length = round((window[1] - window[0]) * rate / 1000)
+
+        self.starts = np.searchsorted(time, self.event_times + window[0])
+        self.ends = np.searchsorted(time, self.event_times + window[1])
+        self.complete = self.ends - self.starts == self.length
+
+    def __len__(self):
+        return len(self.event_times)
+
+    def __getitem__(self, index):
+        return self.signal[self.starts[index] : self.ends[index]]
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def to_array(self):
+        """
+        All epochs in one array, padded with NaN where no sample was recorded.
+        """
+        array = np.full((len(self), self.length), np.nan)
+        for row, (start, end) in enumerate(zip(self.starts, self.ends)):
+            if self.complete[row]:
+                array[row] = self.signal[start:end]
+                continue
+
+            columns = np.rint(
+                (self.time[start:end] - self.event_times[row] - self.window[0]) * self.rate / 1000
+            ).astype(np.int64)
+            inside = (columns >= 0) & (columns < self.length)
+            array[row, columns[inside]] = self.signal[start:end][inside]
+
+        return array
+
+
+def get_triggers(messages):
+    """
+    Find all triggers among the messages of a session in one go, sorted by time.
+    Returns arrays of their time, event number (first digit) and condition (second digit).
+    """
+    texts = messages["text"]
+    is_trigger = np.char.startswith(texts, "trig")
+
+    times = messages["time"][is_trigger]
+    codes = np.char.replace(texts[is_trigger], "trig", "").astype(np.int64)
+
+    order = np.argsort(times, kind="stable")
+    return {
+        "time": times[order],
+        "event": codes[order] // 10,
+        "condition": codes[order] % 10,
+    }
+
+
+def find_events(triggers, event):
+    """
+    Times and conditions of every occurrence of `event` (e.g. 'cue_onset').
+    """
+    is_event = triggers["event"] == EVENTS[event]
+    return triggers["time"][is_event], triggers["condition"][is_event]
+
+
+def find_resumes(messages):
+    """
+    Time of every message that the session was resumed, with the number of trials
+    saved before it (see main.py).
+    """
+    return [
+        (time, int(text.rpartition(" ")[2]))
+        for time, text in zip(messages["time"], messages["text"])
+        if text.startswith(RESUMED)
+    ]
+
+
+def find_trial_ids(messages):
+    """
+    Times and numbers of every trial started (see main.py), sorted by time.
+    """
+    texts = messages["text"]
+    is_trial = np.char.startswith(texts, TRIAL_ID + " ")
+
+    times = messages["time"][is_trial]
+    numbers = np.char.replace(texts[is_trial], TRIAL_ID + " ", "").astype(np.int64)
+
+    order = np.argsort(times, kind="stable")
+    return times[order], numbers[order]
+
+
+def match_saved_trials(event_times, messages, trial_numbers):
+    """
+    Index of the event of every saved trial (by its `trial_numbers`) among `event_times`.
+    Trials that were stopped (by quitting or a crash) before they were saved are run
+    again with the same number when the session is resumed, so the last one counts.
+    """
+    trial_times, numbers = find_trial_ids(messages)
+    started = np.searchsorted(trial_times, event_times, side="right") - 1
+    event_trials = np.where(started >= 0, numbers[np.maximum(started, 0)], -1)
+
+    last = {trial: index for index, trial in enumerate(event_trials.tolist())}
+    missing = [trial for trial in trial_numbers if trial not in last]
+    if missing:
+        raise Exception(
+            f"Expected a trigger for every saved trial, but found none for trials {missing}."
+        )
+
+    return np.array([last[trial] for trial in trial_numbers], dtype=np.int64)
+
+
+def epoch_session(gaze, trials: pd.DataFrame, event="cue_onset", window=(-500, 1500)):
+    """
+    Cut the gaze into epochs from `window[0]` to `window[1]` ms around every `event`,
+    and match them with the trials by the TRIALID message sent before them (or in the
+    order they happened, for sessions recorded without those). Triggers of trials that
+    weren't saved are left out.
+    Returns the trials (with the time and sample of the event added, and whether the
+    epoch has all its samples, see Epochs), the epochs of x, y and pupil and the time
+    of every epoch sample relative to the event.
+    """
+    event_times, conditions = find_events(get_triggers(gaze["messages"]), event)
+
+    if np.any(np.char.startswith(gaze["messages"]["text"], TRIAL_ID + " ")):
+        saved = match_saved_trials(
+            event_times, gaze["messages"], trials["trial_number"].tolist()
+        )
+    else:
+        # Recorded before trials were numbered, when a trial stopped after its triggers
+        # were sent could only be the last trial before the session was resumed or ended
+        saved = np.ones(len(event_times), dtype=bool)
+        for time, n_trials in find_resumes(gaze["messages"]) + [(np.inf, len(trials))]:
+            sent = np.flatnonzero(saved & (event_times < time))
+            if len(sent) == n_trials + 1:
+                saved[sent[-1]] = False
+    event_times, conditions = event_times[saved], conditions[saved]
+
+    if len(event_times) != len(trials):
+        raise Exception(
+            f"Expected {len(trials)} {event} triggers (one per trial), "
+            f"but found {len(event_times)}."
+        )
+
+    # The condition in the trigger should match the condition saved for that trial
+    expected = trials["condition_code"].to_numpy() % 10
+    if np.any(conditions != expected):
+        raise Exception(
+            f"Triggers don't match the trials, from trial "
+            f"{np.flatnonzero(conditions != expected)[0] + 1} onwards."
+        )
+
+    rate = gaze["rate"] or 1000
+    samples = np.searchsorted(gaze["time"], event_times)
+    epochs = {
+        name: Epochs(gaze[name], gaze["time"], event_times, window, rate)
+        for name in ["x", "y", "pupil"]
+    }
+
+    trials = trials.assign(
+        event_time=event_times, event_sample=samples, epoch_complete=epochs["x"].complete
+    )
+
+    return trials, epochs, window[0] + np.arange(epochs["x"].length) * 1000 / rate
+
+
+def assign_to_epochs(times, event_times, window=(-500, 1500)):
+    """
+    For every time (e.g. a microsaccade onset), find the epoch it falls in.
+    Returns the index of that epoch (or -1 if none) and the time relative to its event.
+    Epochs are expected not to overlap.
+    """
+    times = np.asarray(times)
+    index = np.searchsorted(event_times, times - window[1], side="right")
+    index = np.minimum(index, len(event_times) - 1)
+
+    relative = times - event_times[index] if len(event_times) else times * np.nan
+    inside = (relative >= window[0]) & (relative < window[1])
+
+    return np.where(inside, index, -1), np.where(inside, relative, np.nan)
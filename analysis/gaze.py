@@ -0,0 +1,190 @@
+"""
+This file contains the functions necessary for
+turning the .edf file of a session into gaze arrays that can be
+opened without loading them into memory.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+usage:
+
+   python -m analysis.gaze 1_37.edf [2_12.edf ...]
+
+made by Anna van Harmelen, 2025
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import numpy as np
+
+CHUNK_SIZE = 100_000  # samples parsed before writing them to disk
+COLUMNS = ["time", "x", "y", "pupil"]
+
+
+def edf_to_asc(edf_path):
+    """
+    Export an .edf file to an .asc file next to it, using SR Research's edf2asc
+    (part of the EyeLink developer kit), unless that was already done.
+    """
+    asc_path = os.path.splitext(edf_path)[0] + ".asc"
+
+    if os.path.exists(asc_path) and os.path.getmtime(asc_path) >= os.path.getmtime(edf_path):
+        return asc_path
+
+    if shutil.which("edf2asc") is None:
+        raise Exception(
+            "Expected edf2asc (from the EyeLink developer kit) to be installed, "
+            f"or {asc_path!r} to exist already."
+        )
+
+    subprocess.run(["edf2asc", "-y", edf_path], check=True, stdout=subprocess.DEVNULL)
+
+    return asc_path
+
+
+def get_gaze_directory(path):
+    """
+    The gaze arrays of 1_37.edf are saved in 1_37_gaze/, next to it.
+    """
+    return os.path.splitext(path)[0] + "_gaze"
+
+
+def convert(path, eye="RIGHT", directory=None):
+    """
+    Convert an .edf (or its .asc export) to one .npy file per column
+    (time in ms, gaze x and y in pixels and pupil size, missing values being NaN),
+    plus messages.npy (time and text of every message) and info.json.
+    These are saved in `directory` (see `get_gaze_directory` by default),
+    which is returned. Give a list of paths for a session that was resumed,
+    to put the parts one after another.
+    """
+    paths = [path] if isinstance(path, str) else list(path)
+    paths = [edf_to_asc(path) if path.endswith(".edf") else path for path in paths]
+
+    directory = directory or get_gaze_directory(paths[0])
+    os.makedirs(directory, exist_ok=True)
+
+    # First find out how much room is needed, so the arrays can be made on disk
+    scans = [_scan_asc(path) for path in paths]
+    n_samples = sum(n for n, _, _ in scans)
+    rate = scans[0][2]
+
+    columns = {
+        name: np.lib.format.open_memmap(
+            os.path.join(directory, f"{name}.npy"),
+            mode="w+",
+            # At 2000 Hz, every other sample is half a ms after a whole ms
+            dtype=np.float64 if name == "time" else np.float32,
+            shape=(n_samples,),
+        )
+        for name in COLUMNS
+    }
+
+    messages = []
+    chunk = []
+    filled = 0
+
+    for path, (_, binocular, _) in zip(paths, scans):
+        x_column = 4 if binocular and eye == "RIGHT" else 1
+
+        with open(path) as file:
+            for line in file:
+                if line[:1].isdigit():
+                    chunk.append(line.split(None, x_column + 3))
+
+                    if len(chunk) == CHUNK_SIZE:
+                        filled = _write_chunk(columns, filled, chunk, x_column)
+                        chunk = []
+
+                elif line.startswith("MSG"):
+                    timestamp, _, text = line[4:].strip().partition(" ")
+                    messages.append((float(timestamp), text))
+
+        filled = _write_chunk(columns, filled, chunk, x_column)
+        chunk = []
+
+    if len(paths) > 1 and np.any(np.diff(columns["time"]) < 0):
+        raise Exception(
+            f"Expected the parts {paths} to be recorded one after another on the same "
+            "tracker, but their times overlap."
+        )
+
+    for column in columns.values():
+        column.flush()
+
+    np.save(
+        os.path.join(directory, "messages.npy"),
+        np.array(
+            messages,
+            dtype=[("time", np.float64), ("text", f"U{max([len(m[1]) for m in messages] + [1])}")],
+        ),
+    )
+
+    with open(os.path.join(directory, "info.json"), "w") as file:
+        json.dump(
+            {
+                "source": ", ".join(os.path.basename(path) for path in paths),
+                "eye": eye,
+                "rate": rate,
+            },
+            file,
+        )
+
+    return directory
+
+
+def load_gaze(directory):
+    """
+    Open the arrays saved by `convert` without reading them into memory.
+    """
+    gaze = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in COLUMNS
+    }
+    gaze["messages"] = np.load(os.path.join(directory, "messages.npy"))
+
+    with open(os.path.join(directory, "info.json")) as file:
+        gaze.update(json.load(file))
+
+    return gaze
+
+
+def _scan_asc(path):
+    n_samples = 0
+    binocular = False
+    rate = None
+
+    with open(path) as file:
+        for line in file:
+            if line[:1].isdigit():
+                n_samples += 1
+            elif line.startswith("SAMPLES"):
+                fields = line.split()
+                binocular = "LEFT" in fields and "RIGHT" in fields
+                if "RATE" in fields:
+                    rate = float(fields[fields.index("RATE") + 1])
+
+    return n_samples, binocular, rate
+
+
+def _write_chunk(columns, start, chunk, x_column):
+    if not chunk:
+        return start
+
+    end = start + len(chunk)
+    columns["time"][start:end] = [float(fields[0]) for fields in chunk]
+
+    # Missing values are written as '.' in .asc files
+    for name, offset in [("x", 0), ("y", 1), ("pupil", 2)]:
+        columns[name][start:end] = [
+            np.nan if fields[x_column + offset] == "." else float(fields[x_column + offset])
+            for fields in chunk
+        ]
+
+    return end
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(f"Gaze of {path} saved in {convert(path)}")
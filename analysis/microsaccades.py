@@ -0,0 +1,131 @@
+"""
+This file contains the functions necessary for
+detecting microsaccades in the gaze of a whole session at once,
+following Engbert & Kliegl (2003).
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+
+VELOCITY_THRESHOLD = 6  # in median-based standard deviations of the velocity
+MIN_DURATION = 6  # in ms
+BLINK_PADDING = 50  # in ms, ignored around missing samples (and recording gaps)
+MAX_INTERVAL = 1.5  # in sample intervals, between samples of the same recording
+
+
+def compute_velocity(x, y, rate, time=None):
+    """
+    Smoothed velocity (in pixels/s) of every sample, from the two samples on
+    either side of it. The first and last two samples have no velocity (NaN),
+    nor do those next to a gap in `time` (in ms, e.g. where recording stopped
+    to calibrate), as their neighbours weren't recorded right before or after them.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    velocity = np.full((2, len(x)), np.nan)
+    for row, position in enumerate([x, y]):
+        velocity[row, 2:-2] = (
+            position[4:] + position[3:-1] - position[1:-3] - position[:-4]
+        ) * (rate / 6)
+
+    if time is not None and len(x):
+        # Gap between sample g and g + 1, used by the velocity of samples g - 1 to g + 2
+        gaps = np.flatnonzero(np.diff(time) > MAX_INTERVAL * 1000 / rate)
+        for offset in range(-1, 3):
+            velocity[:, np.clip(gaps + offset, 0, len(x) - 1)] = np.nan
+
+    return velocity
+
+
+def get_thresholds(velocity, threshold=VELOCITY_THRESHOLD):
+    """
+    Velocity threshold for x and y: `threshold` times a median-based estimate
+    of the standard deviation, so it isn't inflated by the saccades themselves.
+    """
+    sigma = np.sqrt(
+        np.nanmedian(velocity**2, axis=1) - np.nanmedian(velocity, axis=1) ** 2
+    )
+    return threshold * np.maximum(sigma, np.finfo(np.float64).eps)
+
+
+def detect_microsaccades(
+    time,
+    x,
+    y,
+    rate=1000,
+    threshold=VELOCITY_THRESHOLD,
+    min_duration=MIN_DURATION,
+    blink_padding=BLINK_PADDING,
+    pixels_per_degree=None,
+    max_amplitude=None,
+):
+    """
+    Detect all microsaccades in a recording in one go, `time` being in ms.
+    Where it skips samples (recording stopped and started again), nothing is detected
+    across the gap nor within `blink_padding` of it.
+    Returns a dict of arrays, one entry per microsaccade:
+     - onset, offset: time of the first and last sample (same units as `time`)
+     - amplitude: distance between start and end point
+       (in degrees if `pixels_per_degree` is given, otherwise in pixels)
+     - direction: angle of the movement in degrees, 0 being rightward and 90 upward
+     - dx, dy: the horizontal and (upward) vertical movement, in the same units
+     - peak_velocity: in the same units per second
+    """
+    time = np.asarray(time)
+    velocity = compute_velocity(x, y, rate, time)
+    thresholds = get_thresholds(velocity, threshold)
+
+    # A sample is part of a saccade if its velocity falls outside the threshold ellipse
+    with np.errstate(invalid="ignore"):
+        moving = np.sum((velocity / thresholds[:, None]) ** 2, axis=0) > 1
+
+    # Ignore samples close to blinks (or any other missing data)
+    missing = np.isnan(velocity[0])
+    padding = int(blink_padding * rate / 1000)
+    if padding and missing.any():
+        # Number of missing samples within `padding` samples, from a running total
+        total = np.concatenate([[0], np.cumsum(missing)])
+        index = np.arange(len(missing))
+        missing = (
+            total[np.minimum(index + padding + 1, len(missing))]
+            - total[np.maximum(index - padding, 0)]
+        ) > 0
+    moving &= ~missing
+
+    # Find consecutive runs of moving samples that last long enough
+    changes = np.diff(np.concatenate([[0], moving.view(np.int8), [0]]))
+    starts = np.flatnonzero(changes == 1)
+    ends = np.flatnonzero(changes == -1) - 1
+    long_enough = (ends - starts + 1) >= min_duration * rate / 1000
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    scale = pixels_per_degree or 1
+    dx = (np.asarray(x)[ends] - np.asarray(x)[starts]) / scale
+    dy = -(np.asarray(y)[ends] - np.asarray(y)[starts]) / scale  # y of the screen points down
+
+    # Highest speed within each microsaccade (the padding makes every end+1 a valid index)
+    speed = np.append(np.nan_to_num(np.hypot(velocity[0], velocity[1])), 0) / scale
+    peak_velocity = (
+        np.maximum.reduceat(speed, np.ravel(np.column_stack([starts, ends + 1])))[::2]
+        if len(starts)
+        else np.empty(0)
+    )
+
+    microsaccades = {
+        "onset": time[starts],
+        "offset": time[ends],
+        "amplitude": np.hypot(dx, dy),
+        "direction": np.degrees(np.arctan2(dy, dx)),
+        "dx": dx,
+        "dy": dy,
+        "peak_velocity": peak_velocity,
+    }
+
+    if max_amplitude is not None:
+        small = microsaccades["amplitude"] <= max_amplitude
+        microsaccades = {key: value[small] for key, value in microsaccades.items()}
+
+    return microsaccades
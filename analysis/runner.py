@@ -0,0 +1,212 @@
+"""
+This file contains the functions necessary for
+analysing every session in the data directory in parallel, one process per session,
+and merging the results into one group dataset.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+usage:
+
+   python -m analysis.runner [directory] [number of processes]
+
+made by Anna van Harmelen, 2025
+"""
+
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from analysis.cache import Cache
+from analysis.epochs import assign_to_epochs, epoch_session
+from analysis.gaze import convert, load_gaze
+from analysis.microsaccades import detect_microsaccades
+from eyetracker import get_edf_filename
+from registry import COLUMNS, read_participants
+
+EVENT = "cue_onset"
+WINDOW = (-500, 1500)  # in ms around the event
+GROUP_FILE = "microsaccades_all.csv"
+CACHE_DIRECTORY = "cache"
+
+
+def find_sessions(directory):
+    """
+    Every session in participantinfo.csv that has both its data_session_N.csv
+    and its eyetracking data (.edf, or the .asc export of it) in `directory`,
+    with every part of it if the session was resumed (see eyetracker.get_edf_filename).
+    Sessions of which a part is missing are skipped.
+    """
+    participants = read_participants(directory).reindex(columns=COLUMNS)
+    n_parts = pd.to_numeric(participants.parts).fillna(1).astype(int)
+
+    sessions = []
+    for participant, session, parts in zip(
+        participants.participant_number, participants.session_number, n_parts
+    ):
+        trials = os.path.join(directory, f"data_session_{session}.csv")
+        gaze = []
+        for part in range(1, parts + 1):
+            name = get_edf_filename(participant, session, part)[:-4]
+            found = [
+                os.path.join(directory, name + extension)
+                for extension in [".edf", ".asc"]
+                if os.path.exists(os.path.join(directory, name + extension))
+            ]
+            if not found:
+                # E.g. still on the tracker, as the session crashed before it was transferred
+                if parts > 1:
+                    print(f"Skipping session {session}, as {name}.edf is missing.")
+                gaze = []
+                break
+            gaze.append(found[0])
+
+        if os.path.exists(trials) and gaze:
+            sessions.append(
+                {
+                    "participant": int(participant),
+                    "session": int(session),
+                    "trials": trials,
+                    "gaze": gaze,
+                    "output": os.path.join(directory, f"microsaccades_session_{session}.csv"),
+                }
+            )
+
+    return sessions
+
+
+def process_session(
+    session, cache_directory, force=False, eye="RIGHT", event=EVENT, window=WINDOW, **detection
+):
+    """
+    Parse, detect the microsaccades of and epoch one session (see `find_sessions`),
+    saving every microsaccade within an epoch with the trial it happened in.
+    Every stage is taken from the cache in `cache_directory` if its input and
+    parameters didn't change (unless `force`), `detection` being passed on to
+    `detect_microsaccades`. Returns the path of the output and the stages computed.
+    """
+    cache = Cache(cache_directory)
+
+    gaze_key, gaze_entry = cache.fetch(
+        "gaze",
+        [cache.file_hash(path) for path in session["gaze"]],
+        {"eye": eye},
+        lambda entry: convert(session["gaze"], eye, entry),
+        force,
+    )
+    gaze = load_gaze(gaze_entry)
+
+    def find_microsaccades(entry):
+        microsaccades = detect_microsaccades(
+            gaze["time"], gaze["x"], gaze["y"], gaze["rate"] or 1000, **detection
+        )
+        np.savez(os.path.join(entry, "microsaccades.npz"), **microsaccades)
+
+    microsaccades_key, microsaccades_entry = cache.fetch(
+        "microsaccades", [gaze_key], detection, find_microsaccades, force
+    )
+
+    def cut_epochs(entry):
+        with np.load(os.path.join(microsaccades_entry, "microsaccades.npz")) as file:
+            microsaccades = dict(file)
+
+        trials = pd.read_csv(session["trials"])
+        trials, _, _ = epoch_session(gaze, trials, event, window)
+
+        epoch, relative = assign_to_epochs(
+            microsaccades["onset"], trials["event_time"].to_numpy(), window
+        )
+        inside = epoch >= 0
+
+        results = pd.DataFrame({key: value[inside] for key, value in microsaccades.items()})
+        results.insert(0, "trial_number", trials["trial_number"].to_numpy()[epoch[inside]])
+        results[f"time_from_{event}"] = relative[inside]
+
+        # Horizontal direction relative to the side the target was shown on
+        target_side = np.where(
+            trials["target_position"].to_numpy()[epoch[inside]] == "left", -1, 1
+        )
+        results["toward"] = np.sign(results["dx"].to_numpy()) == target_side
+
+        results = results.merge(
+            trials[["trial_number", "block", "condition_code", "target_position",
+                    "target_duration_cat", "epoch_complete"]],
+            on="trial_number",
+        )
+        results.to_csv(os.path.join(entry, "microsaccades.csv"), index=False)
+
+    _, epochs_entry = cache.fetch(
+        "epochs",
+        [microsaccades_key, cache.file_hash(session["trials"])],
+        {"event": event, "window": window},
+        cut_epochs,
+        force,
+    )
+    shutil.copyfile(os.path.join(epochs_entry, "microsaccades.csv"), session["output"])
+
+    return session["output"], cache.computed
+
+
+def run(directory, processes=None, force=False, **parameters):
+    """
+    Process all sessions in `directory`, each in its own process,
+    then merge them into one file. Returns the merged results.
+    `parameters` (e.g. event, window, threshold, pixels_per_degree)
+    are passed on to `process_session`.
+    """
+    sessions = find_sessions(directory)
+    if not sessions:
+        raise Exception(f"Expected sessions in {directory!r}, but found none.")
+
+    cache_directory = os.path.join(directory, CACHE_DIRECTORY)
+
+    start = time()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {
+            pool.submit(process_session, session, cache_directory, force, **parameters): session
+            for session in sessions
+        }
+        for future in as_completed(futures):
+            session = futures[future]
+            _, computed = future.result()
+            print(
+                f"Session {session['session']}: "
+                f"{'computed ' + ', '.join(computed) if computed else 'all cached'}."
+            )
+
+    print(f"{len(sessions)} sessions done in {time() - start:.1f} s.")
+
+    # Only now, as every process could still need anything in the cache before
+    Cache(cache_directory).evict()
+
+    group = pd.concat(
+        [
+            pd.read_csv(session["output"]).assign(
+                participant=session["participant"], session=session["session"]
+            )
+            for session in sessions
+        ],
+        ignore_index=True,
+    )
+    group.to_csv(os.path.join(directory, GROUP_FILE), index=False)
+
+    # Keep track of how these results were made
+    with open(os.path.join(directory, GROUP_FILE[:-4] + ".json"), "w") as file:
+        json.dump({"event": EVENT, "window": WINDOW, **parameters}, file)
+
+    return group
+
+
+if __name__ == "__main__":
+    from set_up import get_degrees_per_pixel, get_monitor_and_dir
+
+    monitor, directory = get_monitor_and_dir(False)
+    directory = sys.argv[1] if len(sys.argv) > 1 else directory
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    group = run(directory, processes, pixels_per_degree=1 / get_degrees_per_pixel(monitor))
+    print(f"{len(group)} microsaccades saved in {os.path.join(directory, GROUP_FILE)}.")
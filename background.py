@@ -0,0 +1,100 @@
+"""
+This file contains the functions necessary for
+doing work that isn't timing critical (saving, logging) away from the screen.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import queue
+import threading
+import traceback
+from time import perf_counter
+
+MAX_QUEUE_SIZE = 256  # tasks waiting before submitting has to wait as well
+
+
+class BackgroundWorker:
+    """
+    usage:
+
+       from background import BackgroundWorker
+
+    To initialise (done once, in get_settings):
+
+       worker = BackgroundWorker()
+
+    Then, from anywhere in the experiment:
+
+       worker.submit(function, *args)
+       worker.log("Something to print")
+
+    Tasks run one by one, in the order they were submitted, on a separate thread.
+    Triggers must still be sent directly, as their timing matters.
+    """
+
+    def __init__(self, max_queue_size=MAX_QUEUE_SIZE) -> None:
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.n_tasks = 0
+        self.n_blocked = 0
+        self.max_depth = 0
+        self.total_latency = 0
+        self.max_latency = 0
+        self.errors = []
+
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Queue `function(*args, **kwargs)` to be run in the background.
+        This only waits when the queue is full.
+        """
+        if self.queue.full():
+            self.n_blocked += 1
+
+        self.queue.put((perf_counter(), function, args, kwargs))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def log(self, message):
+        self.submit(print, message)
+
+    def idle(self):
+        return self.queue.empty()
+
+    def wait(self):
+        """
+        Wait until every task submitted so far has run.
+        """
+        self.queue.join()
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "tasks": self.n_tasks,
+            "blocked": self.n_blocked,
+            "mean_latency_in_ms": (
+                round(self.total_latency / self.n_tasks * 1000, 3) if self.n_tasks else None
+            ),
+            "max_latency_in_ms": round(self.max_latency * 1000, 3),
+            "errors": len(self.errors),
+        }
+
+    def _work(self):
+        while True:
+            submitted, function, args, kwargs = self.queue.get()
+
+            latency = perf_counter() - submitted
+            self.n_tasks += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                # Keep going, the experiment itself shouldn't stop for this
+                self.errors.append(e)
+                print(traceback.format_exc())
+            finally:
+                self.queue.task_done()
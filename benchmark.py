@@ -0,0 +1,169 @@
+"""
+This script is used to benchmark performance critical parts of
+the 'microsaccade bias duration' experiment, without a window or eyetracker.
+To run the experiment, see main.py.
+
+usage:
+
+   python benchmark.py camera
+   python benchmark.py microsaccades
+   python benchmark.py startup
+   python benchmark.py startup-baseline  (after e.g. updating psychopy on purpose)
+
+made by Anna van Harmelen, 2025
+"""
+
+import array
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import PIL.Image
+
+from lib import cameraimage
+from analysis.microsaccades import detect_microsaccades
+from startup import compare_with_baseline
+
+CAMERA_SIZE = (192, 160)  # default EyeLink camera image, in pixels
+# Timed in the startup benchmark when they're installed (see startup.time_first_screen)
+STARTUP_WITHOUT_SIMULATION = [
+    "import psychopy.visual",
+    "psychopy window and stimuli",
+    "import pylink",
+]
+
+
+def _draw_camera_frame_loop(pal, lines, width):
+    # The original PsychoPyCustomDisplay implementation, kept as reference
+    image_buffer = array.array("I")
+    for buff in lines:
+        for i in buff:
+            if i >= len(pal):
+                image_buffer.append(pal[-1])
+            else:
+                image_buffer.append(pal[i])
+
+    return PIL.Image.frombytes("RGBX", (width, len(lines)), image_buffer.tobytes())
+
+
+def _draw_camera_frame_numpy(pal, lines, frame):
+    for line, buff in enumerate(lines, start=1):
+        cameraimage.fill_line(frame, line, buff, pal)
+
+    return cameraimage.frame_to_image(frame)
+
+
+def _frames_per_second(draw_frame, min_duration=1):
+    n_frames = 0
+    start = perf_counter()
+    while perf_counter() - start < min_duration:
+        draw_frame()
+        n_frames += 1
+
+    return n_frames / (perf_counter() - start)
+
+
+def benchmark_camera():
+    """
+    Camera image frames per second, from pylink's lines of palette indices to a PIL image.
+    """
+    width, height = CAMERA_SIZE
+    rng = np.random.default_rng(0)
+    r, g, b = rng.integers(0, 256, (3, 256))
+
+    # pylink hands over every line as an array of palette indices
+    lines = [array.array("B", rng.integers(0, 256, width).tolist()) for _ in range(height)]
+
+    pal_loop = [int((b_ << 16) | g_ << 8 | r_) for r_, g_, b_ in zip(r, g, b)]
+    pal_numpy = cameraimage.create_palette(r, g, b)
+    frame = cameraimage.create_frame(width, height)
+
+    # Both must give exactly the same image
+    assert (
+        _draw_camera_frame_loop(pal_loop, lines, width).tobytes()
+        == _draw_camera_frame_numpy(pal_numpy, lines, frame).tobytes()
+    )
+
+    before = _frames_per_second(lambda: _draw_camera_frame_loop(pal_loop, lines, width))
+    after = _frames_per_second(lambda: _draw_camera_frame_numpy(pal_numpy, lines, frame))
+
+    print(f"Camera image ({width}x{height}), frames per second:")
+    print(f"  before (python loop): {before:10.1f}")
+    print(f"  after (numpy):        {after:10.1f}  ({after / before:.1f}x)")
+
+
+def benchmark_microsaccades(n_sessions=20, duration=3600, rate=1000):
+    """
+    Seconds needed to detect the microsaccades of 20 one hour recordings at 1000 Hz.
+    """
+    rng = np.random.default_rng(0)
+    n_samples = duration * rate
+
+    # Fixational drift, with a small saccade every second
+    x = 960 + np.cumsum(rng.normal(0, 0.05, n_samples))
+    y = 540 + np.cumsum(rng.normal(0, 0.05, n_samples))
+    x += np.repeat(np.arange(duration) * 10.0, rate)
+    time = np.arange(n_samples)
+
+    start = perf_counter()
+    for _ in range(n_sessions):
+        detect_microsaccades(time, x, y, rate)
+    seconds = perf_counter() - start
+
+    print(f"Microsaccade detection, {n_sessions} sessions of {duration / 3600:g} h at {rate} Hz:")
+    print(f"  {seconds:.1f} s ({seconds / n_sessions:.2f} s per session)")
+
+
+def benchmark_startup(n_runs=5, update=False):
+    """
+    Seconds from starting a new python process with main.py to its first screen,
+    including importing psychopy, opening the window and importing pylink when they're
+    installed (see startup.time_first_screen). Raises if the median is too much slower
+    than the baseline of this computer (see startup.compare_with_baseline), which is
+    saved the first time (or with `update`), so a slower start doesn't go unnoticed.
+    """
+    # Every run in a new process, so nothing has been imported yet
+    code = (
+        "import json, sys, startup; "
+        "print(json.dumps(startup.time_first_screen(sys.argv[1])))"
+    )
+
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(n_runs):
+            output = subprocess.run(
+                [sys.executable, "-c", code, directory],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"Startup to the first screen, median of {n_runs} new processes:")
+    for name in runs[0]:
+        print(f"  {name:<28} {np.median([run[name] for run in runs]):6.2f} s")
+
+    # Only comparable with a baseline measured with the same steps
+    left_out = [name for name in STARTUP_WITHOUT_SIMULATION if name in runs[0]]
+    name = "startup" + (f" with {', '.join(left_out)}" if left_out else " (simulation)")
+    startup = float(np.median([run["total"] for run in runs]))
+    baseline = compare_with_baseline(name, startup, update=update)
+    print(f"  {startup / baseline:.0%} of the baseline of this computer ({baseline:.2f} s)")
+
+
+BENCHMARKS = {
+    "camera": benchmark_camera,
+    "microsaccades": benchmark_microsaccades,
+    "startup": benchmark_startup,
+    "startup-baseline": lambda: benchmark_startup(update=True),
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
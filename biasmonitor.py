@@ -0,0 +1,153 @@
+"""
+This file contains the functions necessary for
+keeping track of the microsaccade bias during the session, so the experimenter
+can see whether the data look right at every break.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+from analysis.microsaccades import BLINK_PADDING, detect_microsaccades
+from gazebuffer import SAMPLE_RATE
+
+WINDOW = 1000  # in ms after the cue
+BIN_SIZE = 100  # in ms
+CONTEXT = 250  # samples kept from the previous update, so no microsaccade is cut in half
+MAX_AMPLITUDE = 1  # in degrees
+MAX_DURATION = 100  # in ms, waited after the window for the microsaccades in it to end
+
+
+class BiasMonitor:
+    """
+    usage:
+
+       bias_monitor = BiasMonitor(eyelinker.gaze, settings)
+
+    At the start of every block:
+
+       bias_monitor.start_block(block)
+
+    Right after the cue is shown:
+
+       bias_monitor.cue(target_position)
+
+    Then every now and then (at most BUFFER_DURATION apart, e.g. after every trial):
+
+       bias_monitor.update()
+
+    Every update copies the samples that came in since the previous one, and looks for
+    microsaccades in them on the background worker. Everything else happens on the
+    worker as well, so nothing is changed by two threads at once. What came in before
+    the start of a block (e.g. during a break or calibration) isn't looked at.
+    The microsaccades within WINDOW ms after every cue are counted per block, per BIN_SIZE ms,
+    split in those toward and away from the side the target was shown on.
+    `bias_monitor.report(block)` prints these counts, it should be submitted to the worker
+    as well (`settings["background"].submit(bias_monitor.report, block)`).
+    """
+
+    def __init__(self, gaze, settings) -> None:
+        self.gaze = gaze
+        self.worker = settings["background"]
+        self.pixels_per_degree = settings["deg2pix"](10) / 10
+        self.block = None
+
+        self.n_processed = gaze.n_samples
+        self.context = np.empty((0, 4))
+        self.processed_until = -np.inf
+
+        # Cues whose window hasn't been processed yet: time, side of the target, block
+        self.cues = []
+        self.onsets = np.empty(0)
+        self.dx = np.empty(0)
+
+        # Per block: numbers of trials and of microsaccades toward and away per bin
+        self.trials = {}
+        self.counts = {}
+
+    def start_block(self, block):
+        self.block = block
+        _, self.n_processed = self.gaze.since(self.gaze.n_samples)
+        self.worker.submit(self._start_block, block)
+
+    def cue(self, target_position):
+        # Time of the most recent sample, in the time of the eyetracker
+        newest = self.gaze.latest(1)
+        if len(newest):
+            self.worker.submit(
+                self.cues.append,
+                (newest[-1, 0], -1 if target_position == "left" else 1, self.block),
+            )
+
+    def update(self):
+        new, self.n_processed = self.gaze.since(self.n_processed)
+        if len(new):
+            self.worker.submit(self._update, new.copy())
+
+    def _start_block(self, block):
+        self.trials[block] = 0
+        self.counts[block] = np.zeros((2, WINDOW // BIN_SIZE), dtype=int)
+        self.context = np.empty((0, 4))
+
+    def _update(self, new):
+        samples = np.concatenate([self.context, new])
+        self.context = samples[-CONTEXT:]
+
+        microsaccades = detect_microsaccades(
+            samples[:, 0],
+            samples[:, 1],
+            samples[:, 2],
+            SAMPLE_RATE,
+            pixels_per_degree=self.pixels_per_degree,
+            max_amplitude=MAX_AMPLITUDE,
+        )
+
+        # The last two samples have no velocity, and samples close to those are ignored
+        # like those close to blinks, so microsaccades ending there might still be going on.
+        # These are found again in the context of the next update.
+        edge = BLINK_PADDING * SAMPLE_RATE // 1000 + 4
+        end = samples[-edge, 0] if len(samples) >= edge else -np.inf
+        final = (microsaccades["offset"] > self.processed_until) & (microsaccades["offset"] < end)
+        self.processed_until = max(end, self.processed_until)
+
+        self.onsets = np.append(self.onsets, microsaccades["onset"][final])
+        self.dx = np.append(self.dx, microsaccades["dx"][final])
+
+        self._count(self.processed_until)
+
+    def report(self, block):
+        counts = self.counts.get(block, np.zeros((2, WINDOW // BIN_SIZE), dtype=int))
+
+        lines = [
+            f"Microsaccades in block {block} ({self.trials.get(block, 0)} trials), "
+            "toward and away from the target, after the cue:"
+        ]
+        for start, (toward, away) in zip(range(0, WINDOW, BIN_SIZE), counts.T):
+            bias = toward - away
+            lines.append(
+                f"  {start:>4}-{start + BIN_SIZE:<4} ms {toward:>4} {away:>4}  "
+                f"{('+' if bias > 0 else '-') * abs(bias)}"
+            )
+        lines.append(f"  total        {counts[0].sum():>4} {counts[1].sum():>4}")
+
+        print("\n".join(lines))
+
+    def _count(self, processed_until):
+        # Count the microsaccades of every cue whose window has been processed completely
+        while self.cues and self.cues[0][0] + WINDOW + MAX_DURATION <= processed_until:
+            time, side, block = self.cues.pop(0)
+
+            relative = self.onsets - time
+            inside = (relative >= 0) & (relative < WINDOW)
+            bins = (relative[inside] // BIN_SIZE).astype(int)
+            toward = np.sign(self.dx[inside]) == side
+
+            if block in self.counts:
+                self.trials[block] += 1
+                np.add.at(self.counts[block][0], bins[toward], 1)
+                np.add.at(self.counts[block][1], bins[~toward], 1)
+
+        # Forget microsaccades before any cue still to come
+        oldest = self.cues[0][0] if self.cues else processed_until
+        keep = self.onsets >= oldest
+        self.onsets, self.dx = self.onsets[keep], self.dx[keep]
@@ -0,0 +1,65 @@
+"""
+This file contains the functions necessary for
+telling and waiting for time, either for real or (when simulating) instantly.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+from math import floor
+from time import sleep
+
+
+class Clock:
+    """
+    usage:
+
+       clock = settings["clock"]
+       clock.time()
+       clock.wait(0.5)
+
+    Real time, as used during the experiment, in the same clock psychopy uses
+    for the timestamps of window flips.
+    `wait` is precise (psychopy's core.wait), `sleep` lets other threads run.
+    """
+
+    def __init__(self) -> None:
+        # Only needed for real sessions, simulations run without psychopy
+        from psychopy import core
+
+        self.core = core
+
+    def time(self):
+        return self.core.monotonicClock.getTime()
+
+    def wait(self, seconds):
+        self.core.wait(seconds)
+
+    def sleep(self, seconds):
+        sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Simulated time, which only moves forward when waited for or when the
+    (simulated) screen refreshes, so it never actually takes any time.
+    """
+
+    def __init__(self, start=0) -> None:
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def wait(self, seconds):
+        self.now += max(seconds, 0)
+
+    def sleep(self, seconds):
+        self.wait(seconds)
+
+    def next_refresh(self, frame_duration):
+        """
+        Move forward to the next screen refresh, as a flip would.
+        """
+        self.now = (floor(self.now / frame_duration + 1e-9) + 1) * frame_duration
+        return self.now
@@ -0,0 +1,112 @@
+"""
+This file contains the functions necessary for
+relating the time of the experiment (flips, triggers, trials) to the time of the eyetracker,
+so that everything saved in the .csv files can be found back in the eyetracking data.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import json
+import numpy as np
+
+N_PROBES = 5  # tracker times asked for per sync, the fastest answer is kept
+
+
+class ClockSync:
+    """
+    usage:
+
+       clock_sync = ClockSync(settings["clock"])
+
+    Then every now and then (e.g. between trials):
+
+       clock_sync.sync(eyelinker)
+
+    And at the end of the session:
+
+       clock_sync.save(path)
+
+    Every sync asks the tracker for its time a few times, keeping the answer that took
+    the shortest, which is paired with the time of the experiment halfway the question
+    and answer. A SYNC message with that time is sent as well, so the pairs can also be
+    made from the eyetracking data. `fit` finds the offset and drift between both clocks.
+    """
+
+    def __init__(self, clock, n_probes=N_PROBES) -> None:
+        self.clock = clock
+        self.n_probes = n_probes
+        self.times = []  # experiment time (s), tracker time (ms), round trip (ms)
+
+    def sync(self, eyetracker):
+        best = None
+        for _ in range(self.n_probes):
+            before = self.clock.time()
+            tracker_time = eyetracker.tracker_time()
+            after = self.clock.time()
+
+            if tracker_time is None:
+                return
+
+            if best is None or after - before < best[2]:
+                best = ((before + after) / 2, tracker_time, after - before)
+
+        time, tracker_time, round_trip = best
+        self.times.append((time, tracker_time, round_trip * 1000))
+        eyetracker.send_message(f"SYNC {time:.6f}")
+
+    def fit(self):
+        """
+        The line from experiment time (s) to tracker time (ms), and how well it fits.
+        """
+        times = np.array(self.times).reshape(-1, 3)
+
+        if len(times) < 2:
+            raise Exception(f"Expected at least 2 syncs to fit, but received {len(times)}.")
+
+        # Relative to the first sync, so the slope isn't affected by large times
+        start = times[0, 0]
+        slope, intercept = np.polyfit(times[:, 0] - start, times[:, 1], 1)
+        residuals = times[:, 1] - (intercept + slope * (times[:, 0] - start))
+
+        return {
+            "start": start,
+            "tracker_time_at_start_in_ms": intercept,
+            "tracker_ms_per_s": slope,
+            "drift_in_ppm": (slope / 1000 - 1) * 1e6,
+            "residual_sd_in_ms": float(np.std(residuals)),
+            "max_round_trip_in_ms": float(times[:, 2].max()),
+            "n_syncs": len(times),
+        }
+
+    def save(self, path, **details):
+        """
+        Save the fit and every sync, with any `details` (e.g. the first trial they're for).
+        """
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    **details,
+                    **(self.fit() if len(self.times) > 1 else {}),
+                    "syncs": [list(sync) for sync in self.times],
+                },
+                file,
+                indent=4,
+            )
+
+
+def load_clock_sync(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def to_tracker_time(times, clock_sync):
+    """
+    Convert times of the experiment (in s, e.g. from triggers_session_N.csv or the
+    *_clock_time columns of data_session_N.csv) to the time of the eyetracker (in ms),
+    using what `ClockSync.save` saved. When a session was resumed, every part has its
+    own clocksync_session_N_2.json etc., from the `first_trial` of that part onwards.
+    """
+    return clock_sync["tracker_time_at_start_in_ms"] + clock_sync["tracker_ms_per_s"] * (
+        np.asarray(times) - clock_sync["start"]
+    )
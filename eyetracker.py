@@ -6,9 +6,26 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025, using code by Ezra Nasrawi & Baiwei Liu
 """
 
-from lib import eyelinker
-from psychopy import event
+from simulation import SimulatedEyeLinker
+from gazebuffer import GazeBuffer
+import numpy as np
 import os
+import threading
+
+MISSING_GAZE = 1e8  # gaze of missing samples is at least this big (or MISSING_DATA)
+SIMULATED_DAY = 86_400_000  # in ms of the tracker
+
+# Every trigger is the number of its event followed by the condition marker
+EVENTS = [
+    "stimulus_onset_1",
+    "stimulus_onset_2",
+    "cue_onset",
+    "response_onset",
+    "response_offset",
+    "feedback_onset",
+]
+EVENT_CODES = {event: str(number) for number, event in enumerate(EVENTS, start=1)}
+EVENT_INDEX = {event: index for index, event in enumerate(EVENTS)}
 
 
 class Eyelinker:
@@ -21,34 +38,134 @@ class Eyelinker:
 
        eyelinker = Eyelinker(participant, session, window, directory)
        eyelinker.calibrate()
+
+    While recording, the most recent gaze samples are in `eyelinker.gaze` (see GazeBuffer).
+    These are read on a separate thread, so messages and the tracker's time should be
+    sent and asked for with `send_message` and `tracker_time`, which wait for the link
+    to be free (for at most one call of reading the samples, see `read_link_samples`).
+    Reading stops while calibrating, until `start` is called again.
     """
 
-    def __init__(self, participant, session, window, directory) -> None:
+    def __init__(
+        self, participant, session, window, directory, simulated=False, rng=None, part=1
+    ) -> None:
         """
-        This also connects to the tracker
+        This also connects to the tracker, or pretends to if `simulated`
+        (with gaze drawn from `rng`). A session that was resumed is recorded in
+        a new .edf for every `part` (see participantinfo.start_next_part), so an earlier
+        part that's still on the tracker is never overwritten, see `get_edf_filename`.
         """
         self.directory = directory
         self.window = window
-        self.tracker = eyelinker.EyeLinker(
-            window=window, eye="RIGHT", filename=f"{session}_{participant}.edf"
-        )
+        self.simulated = simulated
+        self.link = threading.Lock()
+
+        self.part = part
+        filename = get_edf_filename(participant, session, self.part)
+
+        if simulated:
+            self.tracker = SimulatedEyeLinker(
+                window=window,
+                eye="RIGHT",
+                filename=filename,
+                rng=rng,
+                # As if every part was recorded on another day, on the same tracker
+                start=(self.part - 1) * SIMULATED_DAY,
+            )
+            self.gaze = GazeBuffer(self.tracker.read_samples, threaded=False)
+        else:
+            # Only imported here, so simulations run without pylink and pygame installed
+            from lib import eyelinker
+
+            self.tracker = eyelinker.EyeLinker(
+                window=window, eye="RIGHT", filename=filename
+            )
+            self.gaze = GazeBuffer(
+                (lambda: [])
+                if self.tracker.mock
+                else (lambda: read_link_samples(self.tracker, self.link))
+            )
         self.tracker.init_tracker()
 
     def start(self):
-        self.tracker.start_recording()
+        with self.link:
+            self.tracker.start_recording()
+        self.gaze.start()
 
     def calibrate(self):
+        # Calibrating uses the link as well, so reading the gaze waits until `start`
+        self.gaze.stop()
         self.tracker.calibrate()
 
+    def send_message(self, message):
+        with self.link:
+            self.tracker.send_message(message)
+
+    def tracker_time(self):
+        """
+        Current time of the tracker in ms, or None without a (simulated) tracker.
+        """
+        if self.simulated:
+            return self.tracker.tracker_time()
+
+        if self.tracker.mock:
+            return None
+
+        with self.link:
+            return self.tracker.tracker.trackerTimeUsec() / 1000
+
     def stop(self):
         os.chdir(self.directory)
 
+        self.gaze.stop()
         self.tracker.stop_recording()
         self.tracker.transfer_edf()
         self.tracker.close_edf()
 
 
-def get_trigger(frame, positions, durations, target_item):
+def get_edf_filename(participant, session, part=1):
+    """
+    1_37.edf for session 1 of participant 37, and 1_37_2.edf, 1_37_3.edf etc.
+    for the parts recorded after resuming it (the tracker allows 12 characters).
+    """
+    return f"{session}_{participant}{'' if part == 1 else f'_{part}'}.edf"
+
+
+def read_link_samples(tracker, link):
+    """
+    All samples of the tracked eye that came in over the link since the last call,
+    as (time in ms, x, y, pupil), missing values being NaN.
+    The `link` is only locked for every call to the tracker, so a trigger sent
+    meanwhile never has to wait until all samples are read.
+    """
+    import pylink
+
+    samples = []
+
+    while True:
+        with link:
+            data_type = tracker.tracker.getNextData()
+            if not data_type:
+                return samples
+
+            # Events (fixations, saccades, etc.) come in over the link as well
+            if data_type != pylink.SAMPLE_TYPE:
+                continue
+
+            sample = tracker.tracker.getFloatData()
+
+        eye = sample.getRightEye() if tracker.eye == "RIGHT" else sample.getLeftEye()
+        if eye is None:
+            continue
+
+        x, y = eye.getGaze()
+        if x == pylink.MISSING_DATA or abs(x) >= MISSING_GAZE:
+            x, y = np.nan, np.nan
+
+        samples.append((sample.getTime(), x, y, eye.getPupilSize()))
+
+
+def get_condition_marker(positions, durations, target_item):
     condition_marker = int(target_item)
 
     if positions[0] == "right":
@@ -57,11 +174,67 @@ def get_trigger(frame, positions, durations, target_item):
     if durations[0] == "long":
         condition_marker += 4
 
-    return {
-        "stimulus_onset_1": "1",
-        "stimulus_onset_2": "2",
-        "cue_onset": "3",
-        "response_onset": "4",
-        "response_offset": "5",
-        "feedback_onset": "6",
-    }[frame] + str(condition_marker)
+    return condition_marker
+
+
+def get_trigger(frame, positions, durations, target_item):
+    return EVENT_CODES[frame] + str(get_condition_marker(positions, durations, target_item))
+
+
+class TriggerTable:
+    """
+    usage:
+
+       triggers = TriggerTable(positions, duration_cats, target_item, settings["clock"])
+
+    This is done for every trial of the session when it's planned (see main.py), and
+    `triggers.reset()` before the trial is shown. Then, right after what the trigger marks (e.g. the first flip of the cue):
+
+       triggers.send("cue_onset", eyetracker, flip_time)
+
+    The messages of all triggers of a trial are made in advance, so sending one
+    is only a lookup. For every trigger, the time it was meant for and the time it
+    was sent are kept (in the time of settings["clock"]), see `rows`.
+    """
+
+    def __init__(self, positions, durations, target_item, clock) -> None:
+        marker = get_condition_marker(positions, durations, target_item)
+        self.messages = [f"trig{EVENT_CODES[event]}{marker}" for event in EVENTS]
+        self.clock = clock
+        self.intended = np.full(len(EVENTS), np.nan)
+        self.sent = np.full(len(EVENTS), np.nan)
+
+    def reset(self):
+        """
+        Forget when the triggers were sent, before the trial is shown (again).
+        """
+        self.intended[:] = np.nan
+        self.sent[:] = np.nan
+
+    def code(self, event):
+        return self.messages[EVENT_INDEX[event]][4:]
+
+    def send(self, event, eyetracker, intended_time):
+        index = EVENT_INDEX[event]
+        eyetracker.send_message(self.messages[index])
+        self.sent[index] = self.clock.time()
+        self.intended[index] = intended_time
+
+    def rows(self, **columns):
+        """
+        One row per trigger sent, with the given `columns` added to each.
+        """
+        return [
+            {
+                **columns,
+                "event": event,
+                "trigger": message[4:],
+                "intended_time": intended,
+                "sent_time": sent,
+                "delay_in_ms": round((sent - intended) * 1000, 3),
+            }
+            for event, message, intended, sent in zip(
+                EVENTS, self.messages, self.intended, self.sent
+            )
+            if not np.isnan(sent)
+        ]
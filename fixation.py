@@ -0,0 +1,56 @@
+"""
+This file contains the functions necessary for
+checking whether the participant keeps looking at the fixation dot,
+while the stimuli and cue are on the screen.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+
+FIXATION_TOLERANCE = 2  # in degrees from the centre, well above microsaccade size
+
+
+class FixationCheck:
+    """
+    usage:
+
+       fixation = FixationCheck(eyelinker.gaze, settings)
+
+    At the start of every screen that requires fixation:
+
+       fixation.start()
+
+    Then after every flip (if `fixation.every_flip`) and at the end of the screen:
+
+       fixation.check()
+
+    `fixation.broken` is True once any sample since `start` was further than
+    FIXATION_TOLERANCE from the centre of the screen. Missing samples (blinks)
+    don't count, nor does anything if no samples come in (e.g. the mock eyetracker).
+    Simulated gaze (not read on a thread of its own) only comes in when it's asked for,
+    so checking it once per screen finds the same and keeps simulations fast.
+    """
+
+    def __init__(self, gaze, settings, tolerance=FIXATION_TOLERANCE) -> None:
+        self.gaze = gaze
+        self.centre = np.asarray(settings["window"].size, dtype=np.float64) / 2
+        self.tolerance_squared = settings["deg2pix"](tolerance) ** 2
+        self.n_checked = gaze.n_samples
+        self.broken = False
+        self.every_flip = gaze.threaded
+
+    def start(self):
+        # Only samples from now on count
+        _, self.n_checked = self.gaze.since(self.gaze.n_samples)
+
+    def check(self):
+        samples, self.n_checked = self.gaze.since(self.n_checked)
+
+        # Comparing with NaN (missing samples) is always False
+        if len(samples) and not self.broken:
+            offset = samples[:, 1:3] - self.centre
+            self.broken = bool(((offset**2).sum(axis=1) > self.tolerance_squared).any())
+
+        return self.broken
@@ -0,0 +1,157 @@
+"""
+This file contains the functions necessary for
+keeping the most recent gaze samples from the eyetracker in memory while recording,
+read in the background so the screen never has to wait for the tracker.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import threading
+import traceback
+from time import sleep
+
+import numpy as np
+
+BUFFER_DURATION = 20_000  # in ms of samples kept, enough for a few trials
+SAMPLE_RATE = 1000  # in Hz, see send_tracking_settings
+POLL_INTERVAL = 0.001  # in s, waited when no new samples have arrived
+COLUMNS = ["time", "x", "y", "pupil"]
+
+
+class GazeBuffer:
+    """
+    usage:
+
+       from gazebuffer import GazeBuffer
+
+    To initialise (done by the Eyelinker when recording starts):
+
+       gaze = GazeBuffer(read_samples)
+       gaze.start()
+
+    Then, from anywhere in the experiment:
+
+       samples = gaze.latest(100)  # rows of time, x, y and pupil of the last 100 ms
+
+    `read_samples()` should return all samples that arrived since it was last called,
+    as (time in ms, x, y, pupil) with missing values as NaN. It is called on a
+    separate thread until `gaze.stop()`, or whenever samples are asked for
+    if not `threaded` (e.g. in simulations, where no time passes between flips).
+    Anything else using the link to the tracker (e.g. sending triggers) shouldn't wait
+    for all samples to be read, so `read_samples` should only lock the link for every
+    call to the tracker itself (see eyetracker.read_link_samples).
+
+    Every sample is written twice, `size` rows apart, so the last `size` samples are
+    always next to each other and `latest` doesn't have to copy anything. What it
+    returns stays valid until `size` minus its length new samples have come in.
+    """
+
+    def __init__(
+        self,
+        read_samples,
+        duration=BUFFER_DURATION,
+        rate=SAMPLE_RATE,
+        threaded=True,
+    ) -> None:
+        self.read_samples = read_samples
+        self.threaded = threaded
+        self.size = round(duration * rate / 1000)
+        self.data = np.full((2 * self.size, len(COLUMNS)), np.nan)
+        self.n_samples = 0
+        self.errors = []
+
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        # Recording is started again after the long break, while the buffer is still running
+        if self.running:
+            return
+
+        self.running = True
+        if self.threaded:
+            self.thread = threading.Thread(target=self._read, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.running and not self.threaded:
+            self.read()
+
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def read(self):
+        """
+        Add the samples that came in since the last read, returns how many there were.
+        """
+        # Without a thread of its own, every thread asking for samples reads them
+        with self.lock:
+            samples = self.read_samples()
+            if len(samples):
+                self.append(samples)
+
+        return len(samples)
+
+    def append(self, samples):
+        n_samples = len(samples)
+        samples = np.asarray(samples, dtype=np.float64)[-self.size :]
+        start = (self.n_samples + n_samples - len(samples)) % self.size
+        n_first = min(len(samples), self.size - start)
+
+        # Up to the end of the buffer, then the rest from its start
+        for begin, part in [(start, samples[:n_first]), (0, samples[n_first:])]:
+            self.data[begin : begin + len(part)] = part
+            self.data[begin + self.size : begin + self.size + len(part)] = part
+
+        # Only count them once they're written completely
+        self.n_samples += n_samples
+
+    def latest(self, duration=None):
+        """
+        The samples of the last `duration` ms (all kept samples if None), oldest first,
+        as a view on the buffer.
+        """
+        if self.running and not self.threaded:
+            self.read()
+
+        samples = self._last(self.n_samples, self.size)
+
+        if duration is None or not len(samples):
+            return samples
+
+        start = np.searchsorted(samples[:, 0], samples[-1, 0] - duration, side="right")
+        return samples[start:]
+
+    def since(self, n_samples):
+        """
+        The samples that came in after the first `n_samples` (at most the last `size`),
+        as a view on the buffer, and the number of samples that came in so far.
+        """
+        if self.running and not self.threaded:
+            self.read()
+
+        total = self.n_samples
+        return self._last(total, total - n_samples), total
+
+    def _last(self, total, n_samples):
+        # View on the last `n_samples` of the first `total` samples
+        n_samples = max(min(n_samples, total, self.size), 0)
+        end = (total - 1) % self.size + self.size + 1
+        return self.data[end - n_samples : end]
+
+    def _read(self):
+        while self.running:
+            try:
+                n_samples = self.read()
+            except Exception:
+                # Stop reading, rather than failing for every sample
+                self.errors.append(traceback.format_exc())
+                print(self.errors[-1])
+                self.running = False
+                return
+
+            if not n_samples:
+                sleep(POLL_INTERVAL)
@@ -10,12 +10,9 @@ PsychoPyCustomDisplay -- inherited from pylink.EyeLinkCustomDisplay. Defines how
  should be handled by psychopy.
 """
 
-import array
 import string
 import warnings
 
-import PIL
-
 import pylink
 
 import psychopy.event
@@ -23,6 +20,12 @@ import psychopy.sound
 import psychopy.tools
 import psychopy.visual
 
+from . import cameraimage
+
+DEFAULT_IMAGE_SIZE = (192, 160)  # camera image size until the tracker tells us otherwise
+LINE_POOL_SIZE = 16
+LOZENGE_POOL_SIZE = 4
+
 
 class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
     """Defines how pylink events should be handled by psychopy.
@@ -57,8 +60,8 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
         self.window_adj = [i / 2 for i in self.window.size]
         self.tracker = tracker
 
-        self.pal = []
-        self.image_buffer = array.array('I')
+        self.pal = cameraimage.create_palette([], [], [])
+        self.image_buffer = cameraimage.create_frame(0, 0)
         
         if all(i >= 0.5 for i in self.window.color):
             self.text_color = (-1, -1, -1)
@@ -103,10 +106,19 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
 
         self.mouse = psychopy.event.Mouse(visible=False)
 
+        self.image_object = psychopy.visual.ImageStim(self.window, units='pix')
+
         self.image_title_object = psychopy.visual.TextStim(
             self.window, text='', pos=(0, -200), height=20, units='pix', color=self.text_color
         )
 
+        # Crosshair shapes are reused every camera frame, in the order they are drawn
+        self.image_size = DEFAULT_IMAGE_SIZE
+        self.line_pool = [self._create_line() for _ in range(LINE_POOL_SIZE)]
+        self.lozenge_pool = [self._create_lozenge() for _ in range(LOZENGE_POOL_SIZE)]
+        self.line_index = 0
+        self.lozenge_index = 0
+
         self.cal_target_outer = psychopy.visual.Circle(
             self.window, units='pix', radius=18, lineColor='black', fillColor='white'
         )
@@ -129,6 +141,7 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
 
     def setup_image_display(self, width, height):
         """Shows mouse when camera images are visible."""
+        self.image_size = (width, height)
         psychopy.event.Mouse(visible=True)
         self.window.flip()
 
@@ -138,32 +151,25 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
 
     def draw_image_line(self, width, line, totlines, buff):
         """Draws image from buffer."""
-        for i in buff:
-            if i >= len(self.pal):
-                self.image_buffer.append(self.pal[-1])
-            else:
-                self.image_buffer.append(self.pal[i])
+        if self.image_buffer.shape != (totlines, width):
+            self.image_buffer = cameraimage.create_frame(width, totlines)
 
-        if line == totlines:
-            bufferv = self.image_buffer.tostring()
-            image = PIL.Image.frombytes("RGBX", (width, totlines), bufferv)
+        cameraimage.fill_line(self.image_buffer, line, buff, self.pal)
 
-            psychopy_image = psychopy.visual.ImageStim(self.window, image=image)
+        if line == totlines:
+            self.image_object.image = cameraimage.frame_to_image(self.image_buffer)
 
-            psychopy_image.draw()
+            self.image_object.draw()
             self.draw_cross_hair()
             self.image_title_object.draw()
             self.window.flip()
 
-            self.image_buffer = array.array('I')
+            self.line_index = 0
+            self.lozenge_index = 0
 
     def set_image_palette(self, r, g, b):
         """Defines image colors."""
-        self.pal = []
-
-        # Code taken from pylink docs and altered
-        for r_, g_, b_ in zip(r, g, b):
-            self.pal.append((b_ << 16) | g_ << 8 | r_)
+        self.pal = cameraimage.create_palette(r, g, b)
 
     def exit_image_display(self):
         """Hides mouse when camera images are no longer visible."""
@@ -216,10 +222,13 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
 
     def draw_line(self, x1, y1, x2, y2, colorindex):
         """Draws crosshair lines."""
+        width, height = self.image_size
+
         # For some reason the crosshairs need to be fixed like this
+        # (by 767, 639 for the default 192x160 camera image)
         if x1 < 0:
-            x1, x2 = x1 + 767, x2 + 767
-            y1, y2 = y1 + 639, y2 + 639
+            x1, x2 = x1 + 4 * width - 1, x2 + 4 * width - 1
+            y1, y2 = y1 + 4 * height - 1, y2 + 4 * height - 1
 
         if colorindex in self.colors:
             color = self.colors[colorindex]
@@ -227,12 +236,14 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
             color = (0, 0, 0)
 
         # Adjustments are made so that center is (0,0) and y is flipped
-        x1, x2 = x1 - 96, x2 - 96
-        y1, y2 = (160 - y1 - 80), (160 - y2 - 80)
+        x1, x2 = x1 - width / 2, x2 - width / 2
+        y1, y2 = height / 2 - y1, height / 2 - y2
 
-        psychopy.visual.Line(
-            self.window, units='pix', lineColor=color, start=(x1, y1), end=(x2, y2)
-        ).draw()
+        line = self._next_from_pool(self.line_pool, 'line_index', self._create_line)
+        _update(line, 'start', (x1, y1))
+        _update(line, 'end', (x2, y2))
+        _update(line, 'lineColor', color)
+        line.draw()
 
     def draw_lozenge(self, x, y, width, height, colorindex):
         """Draws ovals on image."""
@@ -242,11 +253,29 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
             color = (0, 0, 0)
 
         # Adjustments are made so that center is (0,0) and y is flipped
-        x = round(x + (0.5 * width)) - 96
-        y = round((160 - y) - (0.5 * height)) - 80
+        x = round(x + (0.5 * width)) - self.image_size[0] / 2
+        y = self.image_size[1] / 2 - round(y + (0.5 * height))
+
+        lozenge = self._next_from_pool(self.lozenge_pool, 'lozenge_index', self._create_lozenge)
+        _update(lozenge, 'pos', (x, y))
+        _update(lozenge, 'size', (width, height))
+        _update(lozenge, 'lineColor', color)
+        lozenge.draw()
+
+    def _create_line(self):
+        return psychopy.visual.Line(self.window, units='pix', start=(0, 0), end=(0, 0))
+
+    def _create_lozenge(self):
+        return psychopy.visual.Circle(self.window, units='pix')
 
-        psychopy.visual.Circle(
-            self.window, units='pix', lineColor=color, pos=(x, y), size=(width, height)).draw()
+    def _next_from_pool(self, pool, index_name, create):
+        """Hands out the next unused shape of this camera frame, growing the pool if needed."""
+        index = getattr(self, index_name)
+        if index == len(pool):
+            pool.append(create())
+
+        setattr(self, index_name, index + 1)
+        return pool[index]
 
     def get_mouse_state(self):
         """Gets mouse position."""
@@ -255,6 +284,15 @@ class PsychoPyCustomDisplay(pylink.EyeLinkCustomDisplay):
             mouse_pos, [0, 0], self.window.units, self.window
         )
         # Adjustments are made so that center is (0,0) and y is flipped
-        mouse_pos = (mouse_pos[0] + 96, (160 - mouse_pos[1]) - 80)
+        mouse_pos = (
+            mouse_pos[0] + self.image_size[0] / 2, self.image_size[1] / 2 - mouse_pos[1]
+        )
         mouse_click = 1 if self.mouse.getPressed()[0] else 0
-        return (mouse_pos, mouse_click)
\ No newline at end of file
+        return (mouse_pos, mouse_click)
+
+
+def _update(stim, attribute, value):
+    """Only sets an attribute when it changes, as psychopy recomputes the shape every time."""
+    if getattr(stim, '_pool_' + attribute, None) != value:
+        setattr(stim, attribute, value)
+        setattr(stim, '_pool_' + attribute, value)
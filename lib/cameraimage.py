@@ -0,0 +1,37 @@
+"""Turns the camera image sent by pylink, one line at a time, into a PIL image.
+Used by PsychoPyCustomDisplay, kept separate so it doesn't need pylink or a window.
+Functions:
+create_palette -- Packs the r, g and b palette entries into RGBX pixel values.
+create_frame -- Allocates the buffer a whole camera image is collected in.
+fill_line -- Maps one line of palette indices to pixel values, straight into the frame.
+frame_to_image -- Wraps a completed frame in a PIL image without copying it.
+"""
+
+import numpy
+
+import PIL.Image
+
+
+def create_palette(r, g, b):
+    """Packs the r, g and b palette entries into RGBX pixel values."""
+    r, g, b = (numpy.asarray(c, dtype=numpy.uint32) for c in (r, g, b))
+    return (b << 16) | (g << 8) | r
+
+
+def create_frame(width, height):
+    """Allocates the buffer a whole camera image is collected in."""
+    return numpy.zeros((height, width), dtype=numpy.uint32)
+
+
+def fill_line(frame, line, buff, palette):
+    """Maps one line of palette indices to pixel values, straight into the frame.
+    Indices beyond the palette get its last colour. `line` counts from 1, like pylink.
+    """
+    indices = numpy.asarray(buff, dtype=numpy.intp)
+    numpy.take(palette, indices, out=frame[line - 1, : len(indices)], mode='clip')
+
+
+def frame_to_image(frame):
+    """Wraps a completed frame in a PIL image without copying it."""
+    height, width = frame.shape
+    return PIL.Image.frombuffer('RGBX', (width, height), frame, 'raw', 'RGBX', 0, 1)
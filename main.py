@@ -5,68 +5,142 @@ made by Anna van Harmelen, 2025
 see README.md for instructions if needed
 """
 
-# Import necessary stuff
-from psychopy import core
-import pandas as pd
-from participantinfo import get_participant_details
-from set_up import get_monitor_and_dir, get_settings
-from eyetracker import Eyelinker
-from trial import single_trial, generate_trial_characteristics
-from time import time
-from numpy import mean
-from practice import practice
+# Import necessary stuff, the heavy modules are loaded in main (see startup.py)
+from startup import StartupTimer, preload
 import datetime as dt
-from block import (
-    create_trial_list,
-    block_break,
-    long_break,
-    finish,
-    quick_finish,
-)
 import traceback
+import os
 
 N_BLOCKS = 20
 TRIALS_PER_BLOCK = 40
-
-
-def main():
+MAX_REPEATED_TRIALS = 10  # per block, of trials in which fixation was broken
+
+# Loaded while the participant details are entered, in the order main imports them.
+# On another thread, so none of them may import psychopy or pylink (see startup.py)
+MODULES = [
+    "numpy",
+    "randomness",
+    "participantinfo",
+    "set_up",
+    "eyetracker",
+    "trial",
+    "plan",
+    "practice",
+    "trialwriter",
+    "biasmonitor",
+    "clocksync",
+    "block",
+]
+
+
+def main(
+    backend="psychopy", directory=None, seed=None, startup_only=False, resume=None, id_space=None
+):
     """
     Data formats / storage:
      - eyetracking data saved in one .edf file per session
      - all trial data saved in one .csv per session
-     - subject data in one .csv (for all sessions combined)
+     - when every trigger was sent (and meant to be) in one .csv per session
+     - how the time of the experiment relates to that of the eyetracker in one .json per session
+     - subject data in one .csv (for all sessions combined), with the seed of every session
+
+    Use backend="simulation" to run a whole session without screen, keyboard
+    or eyetracker (see simulate.py), optionally saving to another `directory`.
+    Give the `seed` of an earlier session to replay everything random in it exactly.
+    New participants get a free number from `id_space` (participantinfo.ID_SPACE by
+    default), e.g. a larger one to simulate many participants.
+    Give the number of a session that crashed as `resume` to continue it, with the same
+    participant and trials, from the first trial it didn't save.
+    With `startup_only`, it stops as soon as the first screen could be shown and returns
+    how long starting up took (see benchmark.py).
     """
+    startup = StartupTimer()
+    loading = preload(MODULES)
 
     # Set whether this is a test run or not
     testing = False
+    simulated = backend == "simulation"
+
+    # Get participant age, while the rest is loaded
+    if not (testing or simulated or resume):
+        age = int(input("Participant age: "))
+    else:
+        age = 00
+    startup.phase("participant details")
+
+    loading.join()
+    startup.phase("waiting for modules")
+
+    import numpy as np
+    from pandas import read_csv
+    from randomness import create_random_streams
+    from participantinfo import (
+        ID_SPACE,
+        get_participant_details,
+        get_session_details,
+        start_next_part,
+        save_trials_completed,
+    )
+    from set_up import get_monitor_and_dir, get_settings
+    from eyetracker import Eyelinker, TriggerTable
+    from trial import single_trial
+    from plan import create_session_plan, get_trial_characteristics, get_frames
+    from practice import practice
+    from trialwriter import TrialWriter, write_together
+    from biasmonitor import BiasMonitor
+    from clocksync import ClockSync
+    from block import (
+        block_break,
+        long_break,
+        finish,
+        quick_finish,
+    )
+    startup.phase("imports")
 
     # Get monitor and directory information
-    monitor, directory = get_monitor_and_dir(testing)
-
-    # Get participant details and save in same file as before
-    old_participants = pd.read_csv(
-        rf"{directory}\participantinfo.csv",
-        dtype={
-            "participant_number": int,
-            "session_number": int,
-            "age": int,
-            "trials_completed": str,
-        },
-    )
-    new_participants = get_participant_details(old_participants, testing)
+    monitor, default_directory = get_monitor_and_dir(testing)
+    directory = directory or default_directory
+
+    # A resumed session continues with the participant and seed it had
+    if resume:
+        new_participants = get_session_details(directory, resume)
+        seed = int(new_participants.seed.iloc[-1])
+
+    # All randomness of the session follows from this seed
+    seed, random = create_random_streams(seed)
+
+    # Get participant details and register them in the same file as before
+    if not resume:
+        new_participants = get_participant_details(
+            directory, age, random["participant"], seed, id_space or ID_SPACE
+        )
+    startup.phase("registering participant")
 
     # Initialise set-up
-    settings = get_settings(monitor, directory)
+    settings = get_settings(monitor, directory, backend, random)
     settings["keyboard"].clearEvents()
+    startup.phase("window and stimuli")
 
-    # Connect to eyetracker and calibrate it
+    # Connect to eyetracker and calibrate it, a resumed session is recorded in a new part
     if not testing:
+        part = start_next_part(directory, resume) if resume else 1
         eyelinker = Eyelinker(
             new_participants.participant_number.iloc[-1],
             new_participants.session_number.iloc[-1],
             settings["window"],
             settings["directory"],
+            simulated=simulated,
+            rng=random["simulated_gaze"],
+            part=part,
         )
+        startup.phase("connecting eyetracker")
+
+    settings["background"].log(startup.report())
+    if startup_only:
+        settings["background"].wait()
+        return startup
+
+    if not testing:
         eyelinker.calibrate()
 
     # Start recording eyetracker
@@ -77,26 +151,100 @@ def main():
     practice(None if testing else eyelinker, settings)
 
     # Initialise some stuff
-    start_of_experiment = time()
-    data = []
-    current_trial = 0
+    if not testing:
+        bias_monitor = BiasMonitor(eyelinker.gaze, settings)
+        clock_sync = ClockSync(settings["clock"])
+        clock_sync.sync(eyelinker)
+    start_of_experiment = settings["clock"].time()
+    writer = TrialWriter(
+        os.path.join(
+            settings["directory"],
+            f"data_session_{new_participants.session_number.iloc[-1]}{'_test' if testing else ''}.csv",
+        ),
+        settings["background"],
+        resume=bool(resume),
+    )
+    trigger_writer = TrialWriter(
+        os.path.join(
+            settings["directory"],
+            f"triggers_session_{new_participants.session_number.iloc[-1]}{'_test' if testing else ''}.csv",
+        ),
+        settings["background"],
+        resume=bool(resume),
+        last_trial=writer.rows,
+    )
+    current_trial = writer.rows
+    first_trial = current_trial + 1  # of this part of the session, when resumed
+    trials_completed = 0  # counting every planned trial once, however often it was shown
+    saved = read_csv(writer.path).to_dict("records") if writer.rows else []
+    if resume and not testing:
+        eyelinker.send_message(f"resumed after trial {current_trial}")
     finished_early = True
 
+    # Plan all trials of the session (conditions, durations, frames) in advance
+    n_blocks = 2 if testing else N_BLOCKS
+    plan = create_session_plan(
+        n_blocks, 8 if testing else TRIALS_PER_BLOCK, settings["monitor"]["Hz"], random
+    )
+
+    # And the triggers of every planned trial, which a repeated trial sends again
+    characteristics = [get_trial_characteristics(trial) for trial in plan]
+    trigger_tables = [
+        TriggerTable(
+            trial_characteristics["positions"],
+            trial_characteristics["duration_cats"],
+            trial_characteristics["target_item"],
+            settings["clock"],
+        )
+        for trial_characteristics in characteristics
+    ]
+
     # Start experiment
     try:
-        for block in range(2 if testing else N_BLOCKS):
-            # Pseudo-randomly create conditions and target locations (so they're weighted)
-            trials = create_trial_list(8 if testing else TRIALS_PER_BLOCK)
+        for block in range(n_blocks):
+            if not testing:
+                bias_monitor.start_block(block + 1)
+
+            # Indices of the trials in the plan
+            trials = list(np.flatnonzero(plan["block"] == block + 1))
 
             # Create temporary variable for saving block performance
             block_performance = []
 
-            # Run trials per pseudo-randomly created info
-            for trial in trials:
+            # Run the planned trials,
+            # repeating those in which fixation was broken at the end of the block
+            n_planned = len(trials)
+            n_repeated = 0
+
+            # When resuming, the trials saved before are gone through without running them
+            done = [row for row in saved if row["block"] == block + 1]
+            for index, row in enumerate(done):
+                if row["fixation_broken"] and n_repeated < MAX_REPEATED_TRIALS:
+                    trials.append(trials[index])
+                    n_repeated += 1
+                else:
+                    block_performance.append(int(row["duration_diff_abs"]))
+                trials_completed += index < n_planned
+
+            if done and len(done) == len(trials):
+                continue
+
+            for index, planned in enumerate(trials):
+                if index < len(done):
+                    continue
+
                 current_trial += 1
-                start_time = time()
+                repeated = index >= n_planned
+                start_time = settings["clock"].time()
+
+                # Its triggers are matched to the saved trial by this (see analysis/epochs.py)
+                if not testing:
+                    eyelinker.send_message(f"TRIALID {current_trial}")
 
-                trial_characteristics: dict = generate_trial_characteristics(trial)
+                trial = plan[planned]
+                trial_characteristics: dict = characteristics[planned]
+                triggers = trigger_tables[planned]
+                triggers.reset()
 
                 # Generate trial
                 report: dict = single_trial(
@@ -104,29 +252,61 @@ def main():
                     settings=settings,
                     testing=testing,
                     eyetracker=None if testing else eyelinker,
+                    bias_monitor=None if testing else bias_monitor,
+                    triggers=triggers,
+                    frames=get_frames(trial),
                 )
-                end_time = time()
-
-                # Save trial data
-                data.append(
-                    {
-                        "trial_number": current_trial,
-                        "block": block + 1,
-                        "start_time": str(
-                            dt.timedelta(seconds=(start_time - start_of_experiment))
-                        ),
-                        "end_time": str(
-                            dt.timedelta(seconds=(end_time - start_of_experiment))
-                        ),
-                        **trial_characteristics,
-                        **report,
-                    }
+                end_time = settings["clock"].time()
+
+                trial_data = {
+                    "trial_number": current_trial,
+                    "block": block + 1,
+                    "start_time": str(dt.timedelta(seconds=(start_time - start_of_experiment))),
+                    "end_time": str(dt.timedelta(seconds=(end_time - start_of_experiment))),
+                    # In the time of the triggers, see clocksync.to_tracker_time
+                    "start_clock_time": start_time,
+                    "end_clock_time": end_time,
+                    **trial_characteristics,
+                    **report,
+                    "repeated": repeated,
+                }
+
+                # Save trial data, together with when every trigger was sent compared to
+                # what it marks (written first, so no trial is saved without its triggers)
+                write_together(
+                    (trigger_writer, triggers.rows(trial_number=current_trial)),
+                    (writer, [trial_data]),
                 )
 
-                block_performance.append(int(report["duration_diff_abs"]))
+                # Look for microsaccades in the gaze of this trial, away from the screen
+                if not testing:
+                    bias_monitor.update()
+
+                # Keep track of the time of the eyetracker, in between trials
+                if not testing:
+                    clock_sync.sync(eyelinker)
+
+                # Appending makes the loop above run it again, with the same conditions,
+                # and only that repetition counts
+                if report["fixation_broken"] and n_repeated < MAX_REPEATED_TRIALS:
+                    trials.append(planned)
+                    n_repeated += 1
+                    settings["background"].log(
+                        f"Fixation broken in trial {current_trial}, it will be repeated."
+                    )
+                else:
+                    block_performance.append(int(report["duration_diff_abs"]))
+
+                if not repeated:
+                    trials_completed += 1
 
             # Calculate average performance score for most recent block
-            avg_score = round(mean(block_performance))
+            avg_score = round(np.mean(block_performance))
+            settings["background"].log(
+                f"Block {block + 1} done, reports were on average off by {avg_score} ms."
+            )
+            if not testing:
+                settings["background"].submit(bias_monitor.report, block + 1)
 
             # Break after end of block, unless it's the last block.
             # Experimenter can re-calibrate the eyetracker by pressing 'c' here.
@@ -162,24 +342,34 @@ def main():
             print(traceback.format_exc())
 
     finally:
-        # Stop eyetracker (this should also save the data)
+        # Stop eyetracker (this should also save the data), with how its time relates to ours.
+        # A failing link is likely why we're here, so the last sync may fail as well
         if not testing:
+            try:
+                clock_sync.sync(eyelinker)
+            except Exception:
+                print(traceback.format_exc())
+            clock_sync.save(
+                os.path.join(
+                    settings["directory"],
+                    f"clocksync_session_{new_participants.session_number.iloc[-1]}"
+                    f"{'' if eyelinker.part == 1 else f'_{eyelinker.part}'}.json",
+                ),
+                first_trial=first_trial,
+            )
             eyelinker.stop()
 
-        # Save all collected trial data to a new .csv
-        pd.DataFrame(data).to_csv(
-            rf"{settings['directory']}\data_session_{new_participants.session_number.iloc[-1]}{'_test' if testing else ''}.csv",
-            index=False,
+        # Make sure all collected trial data is written to the .csv
+        writer.close()
+        trigger_writer.close()
+        settings["background"].log(
+            f"Background queue statistics: {settings['background'].stats()}"
         )
+        settings["background"].wait()
 
         # Register how many trials this participant has completed
-        new_participants.loc[new_participants.index[-1], "trials_completed"] = str(
-            len(data)
-        )
-
-        # Save participant data to existing .csv file
-        new_participants.to_csv(
-            rf"{settings['directory']}\participantinfo.csv", index=False
+        save_trials_completed(
+            settings["directory"], new_participants.session_number.iloc[-1], trials_completed
         )
 
         # Done!
@@ -189,7 +379,10 @@ def main():
             # Thanks for meedoen
             finish(N_BLOCKS, settings)
 
-        core.quit()
+        if not simulated:
+            from psychopy import core
+
+            core.quit()
 
 
 if __name__ == "__main__":
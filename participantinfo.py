@@ -6,32 +6,124 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025
 """
 
-import random
 import pandas as pd
+from registry import COLUMNS, ParticipantRegistry
 
+ID_SPACE = range(10, 100)  # participant numbers to choose from
 
-def get_participant_details(existing_participants: pd.DataFrame, testing):
-    # Generate random & unique participant number
-    participant = random.randint(10, 99)
-    while participant in existing_participants.participant_number.tolist():
-        participant = random.randint(10, 99)
 
-    print(f"Participant number: {participant}")
+class ParticipantNumbers:
+    """
+    usage:
+
+       numbers = ParticipantNumbers(used_numbers, rng)
+       participant = numbers.draw()
+
+    Draws numbers from `id_space` that aren't used yet, each equally likely.
+    The free numbers are kept in a list, and a drawn number is swapped with the last
+    one before removing it, so every draw takes the same time however many are used.
+    """
+
+    def __init__(self, used, rng, id_space=ID_SPACE) -> None:
+        used = set(used)
+        self.id_space = id_space
+        self.rng = rng
+        self.free = [number for number in id_space if number not in used]
+
+    def __len__(self):
+        return len(self.free)
+
+    def draw(self):
+        if not self.free:
+            raise Exception(
+                f"Expected a free participant number in {self.id_space}, but all of them "
+                "are used. Choose a larger ID_SPACE."
+            )
+
+        index = int(self.rng.integers(len(self.free)))
+        self.free[index], self.free[-1] = self.free[-1], self.free[index]
+        return self.free.pop()
+
+
+def get_participant_details(directory, age, rng, seed, id_space=ID_SPACE):
+    """
+    Registers a new session straight away, with a participant number that isn't
+    used yet, so another PC saving to the same `directory` can't take the same number
+    or session (see ParticipantRegistry). Returns all participants, the new one last.
+    The age is asked for by main.py, while the rest of the experiment is loaded.
+    """
+    registry = ParticipantRegistry(directory)
+    with registry.locked():
+        existing_participants = registry.read()
+
+        # Generate random & unique participant number
+        participant = ParticipantNumbers(
+            existing_participants.participant_number, rng, id_space
+        ).draw()
+
+        # Insert session number
+        session = int(max(existing_participants.session_number, default=0)) + 1
 
-    if not testing:
-        # Get participant age
-        age = int(input("Participant age: "))
-    else:
-        age = 00
+        new_participant = {
+            "age": age,
+            "participant_number": participant,
+            "session_number": session,
+            "seed": str(seed),
+            "parts": "1",
+        }
+        registry.append(new_participant)
 
-    # Insert session number
-    session = max(existing_participants.session_number) + 1
+    print(f"Participant number: {participant}")
 
-    new_participant = pd.DataFrame(
-        {"age": [age], "participant_number": [participant], "session_number": [session]}
+    return pd.concat(
+        [existing_participants, pd.DataFrame([new_participant])], ignore_index=True
     )
-    all_participants = pd.concat(
-        [existing_participants, new_participant], ignore_index=True
+
+
+def get_session_details(directory, session):
+    """
+    All participants, with the details of an earlier `session` last (e.g. to resume it).
+    """
+    participants = ParticipantRegistry(directory).read()
+    is_session = participants.session_number == session
+
+    if not is_session.any():
+        raise Exception(
+            f"Expected session {session} to be registered in {directory!r}, "
+            "but it isn't."
+        )
+
+    print(f"Participant number: {participants.participant_number[is_session].iloc[0]}")
+
+    return pd.concat(
+        [participants[~is_session], participants[is_session]], ignore_index=True
     )
 
-    return all_participants
+
+def start_next_part(directory, session):
+    """
+    Register that `session` is continued in a new part (e.g. after a crash), before
+    anything is recorded in it, and return the number of that part (2 or more).
+    Every part is recorded in its own .edf, see eyetracker.get_edf_filename.
+    """
+    registry = ParticipantRegistry(directory)
+    with registry.locked():
+        participants = registry.read().reindex(columns=COLUMNS)
+        parts = participants.parts[participants.session_number == session]
+
+        # Sessions registered before parts were counted have at least one
+        part = int(pd.to_numeric(parts).fillna(1).max()) + 1
+        registry.append({"session_number": int(session), "parts": str(part)})
+
+    return part
+
+
+def save_trials_completed(directory, session, trials_completed):
+    """
+    Register how many trials were completed in `session`.
+    """
+    registry = ParticipantRegistry(directory)
+    with registry.locked():
+        registry.append(
+            {"session_number": int(session), "trials_completed": str(trials_completed)}
+        )
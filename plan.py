@@ -0,0 +1,154 @@
+"""
+This file contains the functions necessary for
+planning every trial of a session before it starts, reproducibly from a seed.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+from randomness import create_random_streams
+
+N_CONDITIONS = 8  # target item x order of locations x order of durations
+MAX_RUN_LENGTH = 4  # most trials in a row with the target on the same side
+MAX_SHUFFLES = 10_000  # per session, before giving up on finding short enough runs
+SHORT_DURATIONS = (200, 800)  # in ms, both included
+LONG_DURATIONS = (1000, 1600)  # in ms, both included
+ITI_DURATIONS = (500, 800)  # in ms, both included
+
+PLAN_DTYPE = [
+    ("block", np.int16),
+    ("target_item", np.int8),
+    ("position_1", "U5"),
+    ("position_2", "U5"),
+    ("duration_cat_1", "U5"),
+    ("duration_cat_2", "U5"),
+    ("duration_1", np.int16),
+    ("duration_2", np.int16),
+    ("ITI", np.int16),
+    ("condition_code", "U2"),
+    ("ITI_frames", np.int16),
+    ("stimulus_1_frames", np.int16),
+    ("stimulus_2_frames", np.int16),
+]
+
+
+def create_session_plan(
+    n_blocks, trials_per_block, refresh_rate, random=None, max_run_length=MAX_RUN_LENGTH
+):
+    """
+    All trials of a session, in order, as one structured array (see PLAN_DTYPE),
+    drawn from the "plan" and "ITI" streams of `random` (see create_random_streams).
+    Every block has every condition equally often, and never more than
+    `max_run_length` trials in a row with the target on the same side.
+    """
+    if trials_per_block % N_CONDITIONS != 0:
+        raise Exception(
+            f"Expected number of trials to be divisible by {N_CONDITIONS}, otherwise "
+            f"perfect factorial combinations are not possible, but received {trials_per_block}."
+        )
+
+    random = random or create_random_streams()[1]
+    rng = random["plan"]
+
+    # The bits of a condition are the target item, the order of locations and of durations
+    conditions = np.tile(
+        np.arange(N_CONDITIONS), (n_blocks, trials_per_block // N_CONDITIONS)
+    )
+    conditions = rng.permuted(conditions, axis=1)
+
+    # Shuffle blocks again until none of them has too long a run
+    too_long = _longest_run(_target_side(conditions)) > max_run_length
+    for _ in range(MAX_SHUFFLES):
+        if not too_long.any():
+            break
+        conditions[too_long] = rng.permuted(conditions[too_long], axis=1)
+        too_long = _longest_run(_target_side(conditions)) > max_run_length
+
+    if too_long.any():
+        raise ValueError(
+            f"Expected to find blocks without runs longer than {max_run_length} in "
+            f"{MAX_SHUFFLES} shuffles, but didn't. Allow longer runs."
+        )
+
+    conditions = conditions.ravel()
+    target_item = 1 + (conditions & 1)
+    right_first = (conditions & 2) > 0
+    long_first = (conditions & 4) > 0
+
+    # Draw every duration at once
+    n_trials = len(conditions)
+    short = rng.integers(SHORT_DURATIONS[0], SHORT_DURATIONS[1] + 1, n_trials)
+    long = rng.integers(LONG_DURATIONS[0], LONG_DURATIONS[1] + 1, n_trials)
+
+    plan = np.empty(n_trials, dtype=PLAN_DTYPE)
+    plan["block"] = np.repeat(np.arange(1, n_blocks + 1), trials_per_block)
+    plan["target_item"] = target_item
+    plan["position_1"] = np.where(right_first, "right", "left")
+    plan["position_2"] = np.where(right_first, "left", "right")
+    plan["duration_cat_1"] = np.where(long_first, "long", "short")
+    plan["duration_cat_2"] = np.where(long_first, "short", "long")
+    plan["duration_1"] = np.where(long_first, long, short)
+    plan["duration_2"] = np.where(long_first, short, long)
+    plan["ITI"] = random["ITI"].integers(ITI_DURATIONS[0], ITI_DURATIONS[1] + 1, n_trials)
+
+    # Same as eyetracker.get_trigger("stimulus_onset_1", ...)
+    plan["condition_code"] = np.char.add("1", (conditions + 1).astype(str))
+
+    for name, durations in [
+        ("ITI_frames", plan["ITI"]),
+        ("stimulus_1_frames", plan["duration_1"]),
+        ("stimulus_2_frames", plan["duration_2"]),
+    ]:
+        # Like trial.duration_to_frames
+        plan[name] = np.maximum(1, np.round(durations / 1000 * refresh_rate))
+
+    return plan
+
+
+def get_trial_characteristics(trial):
+    """
+    The characteristics of one planned trial, as generate_trial_characteristics gives them.
+    """
+    target_item = int(trial["target_item"])
+    positions = (str(trial["position_1"]), str(trial["position_2"]))
+    durations = (int(trial["duration_1"]), int(trial["duration_2"]))
+    duration_cats = (str(trial["duration_cat_1"]), str(trial["duration_cat_2"]))
+
+    return {
+        "ITI": int(trial["ITI"]),
+        "target_item": target_item,
+        "target_position": positions[target_item - 1],
+        "target_duration": durations[target_item - 1],
+        "target_duration_cat": duration_cats[target_item - 1],
+        "positions": positions,
+        "durations": durations,
+        "duration_cats": duration_cats,
+    }
+
+
+def get_frames(trial):
+    """
+    The number of frames of the screens of a planned trial whose duration varies.
+    """
+    return {
+        "ITI": int(trial["ITI_frames"]),
+        "stimulus_1": int(trial["stimulus_1_frames"]),
+        "stimulus_2": int(trial["stimulus_2_frames"]),
+    }
+
+
+def _target_side(conditions):
+    # Target on the right: the first item on the right and it's the target, or the reverse
+    return (conditions & 1) != ((conditions & 2) > 0)
+
+
+def _longest_run(values):
+    # Longest run of equal values in every row
+    n_rows, n_columns = values.shape
+    changes = np.ones((n_rows, n_columns), dtype=bool)
+    changes[:, 1:] = values[:, 1:] != values[:, :-1]
+
+    # For every value, the index of the start of its run
+    starts = np.maximum.accumulate(np.where(changes, np.arange(n_columns), 0), axis=1)
+    return (np.arange(n_columns) - starts).max(axis=1) + 1
@@ -6,12 +6,9 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025
 """
 
-import random
 from trial import generate_trial_characteristics
 from stimuli import create_stimulus_frame, draw_fixation_dot, show_text
-from psychopy.core import wait
 from response import get_response, check_quit, wait_for_key
-from time import sleep
 from trial import single_trial
 from numpy import mean
 
@@ -34,7 +31,7 @@ def practice_response(eyetracker, settings):
             "Welcome! "
             "Press SPACE to start practicing how to reproduce durations."
             "\n\nRemember to press Q to stop practising.",
-            settings["window"],
+            settings,
         )
         settings["window"].flip()
         if eyetracker:
@@ -50,25 +47,30 @@ def practice_response(eyetracker, settings):
         settings["keyboard"].clearEvents()
 
         while True:
+            # Only the flips of the current response need to be kept
+            settings["flips"].reset()
+
             # Show fixation dot in preparation
             draw_fixation_dot(settings)
             settings["window"].flip()
-            sleep(0.5)
+            settings["clock"].sleep(0.5)
 
             # Show central square with certain duration
-            stimulus = generate_trial_characteristics([1, ("left", "right"), ("short", "long")])
+            stimulus = generate_trial_characteristics(
+                [1, ("left", "right"), ("short", "long")], settings["random"]["practice"]
+            )
             create_stimulus_frame("middle", 0, settings)
             settings["window"].flip()
-            wait(stimulus["target_duration"] / 1000)
+            settings["clock"].wait(stimulus["target_duration"] / 1000)
 
             # Delay
             draw_fixation_dot(settings)
             settings["window"].flip()
-            wait(1.5)
+            settings["clock"].wait(1.5)
 
             # Allow response
             report = get_response(
-                stimulus["target_duration"], None, None, None, settings, True, None
+                stimulus["target_duration"], None, settings, True, None
             )
 
             # Save for post-hoc feedback
@@ -78,20 +80,20 @@ def practice_response(eyetracker, settings):
             draw_fixation_dot(settings)
             show_text(
                 f"{report['performance']}",
-                settings["window"],
+                settings,
                 (0, settings["deg2pix"](0.3)),
             )
 
             if report["premature_pressed"] == True:
-                show_text("!", settings["window"], (0, -settings["deg2pix"](0.3)))
+                show_text("!", settings, (0, -settings["deg2pix"](0.3)))
 
             settings["window"].flip()
-            sleep(0.25)
+            settings["clock"].sleep(0.25)
 
             # Pause before next one
             draw_fixation_dot(settings)
             settings["window"].flip()
-            sleep(random.randint(1500, 2000) / 1000)
+            settings["clock"].sleep(int(settings["random"]["practice"].integers(1500, 2001)) / 1000)
 
             # Check for pressed 'q'
             check_quit(settings["keyboard"])
@@ -103,7 +105,7 @@ def practice_response(eyetracker, settings):
             f"During this practice, your reports were on average off by {avg_score}. "
             "\nPress SPACE to start practicing full trials."
             "\n\nRemember to press Q to stop practising these trials.",
-            settings["window"],
+            settings,
         )
         settings["window"].flip()
         if eyetracker:
@@ -124,14 +126,18 @@ def practice_trials(eyetracker, settings):
     try:
         performance = []
 
+        rng = settings["random"]["practice"]
+
         while True:
-            target_item = random.choice([1, 2])
-            loc_1 = random.choice(["left", "right"])
+            target_item = [1, 2][rng.integers(2)]
+            loc_1 = ["left", "right"][rng.integers(2)]
             loc_2 = "right" if loc_1 == "left" else "left"
-            dur_1 = random.choice(["short", "long"])
+            dur_1 = ["short", "long"][rng.integers(2)]
             dur_2 = "short" if dur_1 == "long" else "long" 
 
-            trial_characteristics = generate_trial_characteristics((target_item, (loc_1, loc_2), (dur_1, dur_2)))
+            trial_characteristics = generate_trial_characteristics(
+                (target_item, (loc_1, loc_2), (dur_1, dur_2)), rng
+            )
 
             # Generate trial
             report = single_trial(
@@ -152,7 +158,7 @@ def practice_trials(eyetracker, settings):
             f"During this practice, your reports were on average off by {avg_score}. "
             "\nYou decided to stop practicing the trials."
             f"\n\nPress SPACE to start the experiment.",
-            settings["window"],
+            settings,
         )
         settings["window"].flip()
         if eyetracker:
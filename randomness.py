@@ -0,0 +1,33 @@
+"""
+This file contains the functions necessary for
+making everything random in a session follow from one seed, so it can be replayed.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+
+# One independent stream per part of the experiment. Only ever add new ones at the end,
+# so the streams of existing parts stay the same for the same seed.
+STREAMS = [
+    "plan",
+    "ITI",
+    "practice",
+    "participant",
+    "simulated_participant",
+    "simulated_gaze",
+]
+
+
+def create_random_streams(seed=None):
+    """
+    A numpy Generator for every part of the experiment in STREAMS,
+    all following from `seed` (a new one if None). Returns the seed and the streams.
+    """
+    sequence = np.random.SeedSequence(seed)
+
+    return sequence.entropy, {
+        name: np.random.default_rng(child)
+        for name, child in zip(STREAMS, sequence.spawn(len(STREAMS)))
+    }
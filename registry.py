@@ -0,0 +1,180 @@
+"""
+This file contains the functions necessary for
+keeping track of all participants and sessions in participantinfo.csv, safely
+when several PCs save to the same directory or a session crashes halfway.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from time import sleep, time
+
+import pandas as pd
+
+try:
+    import msvcrt
+except ImportError:
+    import fcntl
+
+COLUMNS = ["age", "participant_number", "session_number", "trials_completed", "seed", "parts"]
+DTYPES = {
+    "participant_number": int,
+    "session_number": int,
+    "age": int,
+    "trials_completed": str,
+    "seed": str,
+    "parts": str,
+}
+COMPACT_AFTER = 20  # changes in the log before they're written into the table
+LOCK_TIMEOUT = 10  # in s, waited for another PC to finish with the registry
+
+
+class ParticipantRegistry:
+    """
+    usage:
+
+       registry = ParticipantRegistry(directory)
+
+    To register something, e.g. a new session or how many trials it completed:
+
+       with registry.locked():
+           participants = registry.read()
+           registry.append({"session_number": 3, "trials_completed": "800"})
+
+    Changes are appended to participantinfo.log, one json line each, rather than
+    rewriting all of participantinfo.csv. Every COMPACT_AFTER changes, the table is
+    rewritten with them (to a temporary file first, which then replaces it) and the log
+    is emptied. `read` gives the table with the log applied to it. Applying a change
+    twice does the same as once, so nothing is lost if a crash happens in between.
+
+    The lock is an advisory lock of the operating system on participantinfo.csv.lock,
+    which is released when the session ends, even if it crashed.
+    """
+
+    def __init__(self, directory, compact_after=COMPACT_AFTER) -> None:
+        self.table = os.path.join(directory, "participantinfo.csv")
+        self.log = os.path.join(directory, "participantinfo.log")
+        self.lock = f"{self.table}.lock"
+        self.compact_after = compact_after
+
+    @contextmanager
+    def locked(self, timeout=LOCK_TIMEOUT):
+        with open(self.lock, "a+") as file:
+            start = time()
+            while not _try_lock(file):
+                if time() - start > timeout:
+                    raise Exception(
+                        f"Expected {self.table} to be unlocked within {timeout} s, "
+                        "but another session kept it locked."
+                    )
+                sleep(0.05)
+
+            try:
+                yield
+            finally:
+                _unlock(file)
+
+    def read(self):
+        """
+        All participants and sessions, the most recently registered last.
+        """
+        if os.path.exists(self.table):
+            participants = pd.read_csv(self.table, dtype=DTYPES)
+        else:
+            participants = pd.DataFrame(columns=COLUMNS)
+
+        for change in self._changes():
+            session = participants.session_number == change["session_number"]
+            if "participant_number" in change:
+                # A new session, or one already in the table if the log wasn't emptied
+                # after compacting (e.g. because of a crash)
+                participants = pd.concat(
+                    [participants[~session], pd.DataFrame([change])], ignore_index=True
+                )
+            else:
+                for column, value in change.items():
+                    if column != "session_number":
+                        participants.loc[session, column] = value
+
+        return participants
+
+    def append(self, change):
+        """
+        Add a change to the log (only while `locked`): a new session with all columns,
+        or "session_number" and the columns that changed (e.g. "trials_completed")
+        for an existing one.
+        """
+        with open(self.log, "a+b") as file:
+            # Start on a new line if a crash cut off the last change
+            if file.seek(0, os.SEEK_END):
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+
+            file.write(json.dumps(change).encode() + b"\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+        if len(self._changes()) >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """
+        Write all changes in the log into the table, then empty the log (only while `locked`).
+        """
+        temporary = f"{self.table}.{os.getpid()}.tmp"
+        with open(temporary, "w", newline="") as file:
+            self.read().to_csv(file, index=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.table)
+
+        open(self.log, "w").close()
+
+    def _changes(self):
+        if not os.path.exists(self.log):
+            return []
+
+        changes = []
+        with open(self.log) as file:
+            for line in file:
+                try:
+                    changes.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Cut off by a crash while it was written
+                    pass
+
+        return changes
+
+
+def read_participants(directory):
+    """
+    All participants and sessions registered in `directory`.
+    """
+    registry = ParticipantRegistry(directory)
+    with registry.locked():
+        return registry.read()
+
+
+def _try_lock(file):
+    try:
+        if os.name == "nt":
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+
+    return True
+
+
+def _unlock(file):
+    if os.name == "nt":
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file, fcntl.LOCK_UN)
@@ -6,11 +6,8 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025
 """
 
-from psychopy import event
-from psychopy.hardware.keyboard import Keyboard
-from time import time
-from eyetracker import get_trigger
-from stimuli import draw_one_stimulus, draw_fixation_dot
+from math import isnan
+from stimuli import draw_fixation_dot
 
 
 def evaluate_response(target_duration, response_duration):
@@ -25,53 +22,87 @@ def evaluate_response(target_duration, response_duration):
     }
 
 
+def get_shown_duration(flip_times, n_flips, refresh_rate):
+    """
+    Compute how long something was on screen from the timestamps of the flips
+    it was shown on: the last frame stays visible for (at least) one refresh.
+    """
+    if n_flips == 0:
+        return 0.0
+
+    # The flips started when the FlipRecorder was full, so the first has no timestamp
+    if not len(flip_times):
+        return float("nan")
+
+    last_flip = flip_times[min(n_flips, len(flip_times)) - 1]
+    return float(last_flip - flip_times[0]) + 1 / refresh_rate
+
+
 def get_response(
     target_duration,
-    positions,
-    durations,
-    target_item,
+    triggers,
     settings,
     testing,
     eyetracker,
 ):
-    keyboard: Keyboard = settings["keyboard"]
+    keyboard = settings["keyboard"]
 
     # Check for pressed 'q'
     check_quit(keyboard)
 
     # Show response can start
+    flips = settings["flips"]
+    flips.start_screen("response_prompt", refreshed=False)
     draw_fixation_dot(settings, [-1, -1, -1])
-    settings["window"].flip()
+    flips.flip()
 
     # These timing systems should start at the same time, this is almost true
-    idle_reaction_time_start = time()
+    idle_reaction_time_start = settings["clock"].time()
     keyboard.clock.reset()
 
     # Check if _any_ keys were prematurely pressed
     prematurely_pressed = [(p.name, p.rt) for p in keyboard.getKeys(waitRelease=False)]
     keyboard.clearEvents()
 
+    if prematurely_pressed:
+        settings["background"].log(
+            f"Key {prematurely_pressed[0][0]!r} was pressed before the response could start."
+        )
+
     # Wait for space key press
     keyboard.clock.reset()
     key = keyboard.waitKeys(keyList=["space"], waitRelease=False)
-    response_started = time()
+    response_started = settings["clock"].time()
 
     if not testing and eyetracker:
-        trigger = get_trigger("response_onset", positions, durations, target_item)
-        eyetracker.tracker.send_message(f"trig{trigger}")
+        triggers.send("response_onset", eyetracker, response_started)
 
-    # Show target item while space is held
-    while keyboard.getState("space"):
-        draw_one_stimulus("middle", settings)
-        settings["window"].flip()
+    # Show target item while space is held, keeping track of when each frame was shown
+    square = settings["stimuli"]["items"][("middle", 0)]
+    flips.start_screen("response")
+    first_flip = flips.n
 
-    # Compute both reaction times
-    response_time = time() - response_started
+    while keyboard.getState("space"):
+        square.draw()
+        flips.flip()
+    response_ended = settings["clock"].time()
+
+    # Compute both reaction times, the response time being how long the square was visible
+    n_flips = flips.n - first_flip
+    response_time = get_shown_duration(
+        flips.since(first_flip), n_flips, settings["monitor"]["Hz"]
+    )
     idle_reaction_time = response_started - idle_reaction_time_start
 
+    if isnan(response_time):
+        settings["background"].log(
+            "The flips of the response have no timestamps, its duration is taken "
+            "from when space was pressed and released instead."
+        )
+        response_time = response_ended - response_started
+
     if not testing and eyetracker:
-        trigger = get_trigger("response_offset", positions, durations, target_item)
-        eyetracker.tracker.send_message(f"trig{trigger}")
+        triggers.send("response_offset", eyetracker, response_ended)
 
     # Make sure keystrokes made during this trial don't influence the next
     keyboard.clearEvents()
@@ -79,6 +110,7 @@ def get_response(
     return {
         "idle_reaction_time_in_ms": round(idle_reaction_time * 1000, 2),
         "response_time_in_ms": round(response_time * 1000, 2),
+        "response_frames": n_flips,
         "key_pressed": key[0].name,
         "premature_pressed": True if prematurely_pressed else False,
         "premature_key": prematurely_pressed[0][0] if prematurely_pressed else None,
@@ -90,7 +122,6 @@ def get_response(
 
 
 def wait_for_key(key_list, keyboard):
-    keyboard: Keyboard = keyboard
     keyboard.clearEvents()
     keys = keyboard.waitKeys(keyList=key_list)
 
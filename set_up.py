@@ -6,9 +6,13 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025
 """
 
-from psychopy import visual
-from psychopy.hardware.keyboard import Keyboard
 from math import degrees, atan2, pi
+from stimuli import create_stimuli
+from timing import FlipRecorder
+from background import BackgroundWorker
+from simulation import NullWindow, ScriptedKeyboard, null_visual
+from randomness import create_random_streams
+from clock import Clock, VirtualClock
 
 GABOR_SIZE = 3  # diameter of Gabor
 
@@ -39,25 +43,59 @@ def get_monitor_and_dir(testing: bool):
     return monitor, directory
 
 
-def get_settings(monitor: dict, directory):
-    # Initialise psychopy window
-    window = visual.Window(
-        color=([-0.5, -0.5, -0.5]),
-        size=monitor["resolution"],
-        units="pix",
-        fullscr=True,
-    )
-
+def get_degrees_per_pixel(monitor: dict):
     # Calculate number of visual degrees per pixel on the screen
-    degrees_per_pixel = degrees(atan2(0.5 * monitor["width"], monitor["distance"])) / (
+    return degrees(atan2(0.5 * monitor["width"], monitor["distance"])) / (
         0.5 * monitor["resolution"][0]
     )
 
+
+def get_settings(monitor: dict, directory, backend="psychopy", random=None):
+    # Every random draw of the session comes from these streams, see randomness.py
+    random = random or create_random_streams()[1]
+
+    if backend == "psychopy":
+        # Only imported here, so simulations run without psychopy installed
+        from psychopy import visual
+        from psychopy.hardware.keyboard import Keyboard
+
+        # Initialise psychopy window
+        window = visual.Window(
+            color=([-0.5, -0.5, -0.5]),
+            size=monitor["resolution"],
+            units="pix",
+            fullscr=True,
+        )
+        keyboard = Keyboard()
+        mouse = visual.CustomMouse(win=window, visible=False)
+        stimulus_module = visual
+        clock = Clock()
+    elif backend == "simulation":
+        # Run without screen or keyboard, as fast as possible
+        clock = VirtualClock()
+        window = NullWindow(monitor, clock)
+        keyboard = ScriptedKeyboard(clock, random["simulated_participant"])
+        mouse = None
+        stimulus_module = null_visual
+    else:
+        raise Exception(
+            f"Expected backend 'psychopy' or 'simulation', but received {backend!r}."
+        )
+
+    degrees_per_pixel = get_degrees_per_pixel(monitor)
+    deg2pix = lambda deg: round(deg / degrees_per_pixel)
+
     return dict(
-        deg2pix=lambda deg: round(deg / degrees_per_pixel),
+        deg2pix=deg2pix,
         window=window,
-        keyboard=Keyboard(),
-        mouse=visual.CustomMouse(win=window, visible=False),
+        stimuli=create_stimuli(window, deg2pix, stimulus_module),
+        flips=FlipRecorder(window, monitor["Hz"]),
+        keyboard=keyboard,
+        clock=clock,
+        background=BackgroundWorker(),
+        mouse=mouse,
         monitor=monitor,
         directory=directory,
+        backend=backend,
+        random=random,
     )
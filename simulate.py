@@ -0,0 +1,45 @@
+"""
+This script runs full sessions of the 'microsaccade bias duration' experiment
+without a screen, keyboard or eyetracker, for regression testing and benchmarking.
+The data is saved exactly like in a real session, with the triggers in a .asc file.
+To run the experiment itself, see main.py.
+
+usage:
+
+   python simulate.py [number of sessions] [directory] [seed]
+
+Give the seed of a session (see participantinfo.csv) to replay it exactly.
+
+made by Anna van Harmelen, 2025
+"""
+
+import os
+import sys
+from time import time
+from main import main
+
+DEFAULT_DIRECTORY = r"../../Data/simulation/"
+# Participant numbers of simulated sessions, enough for thousands in one directory
+SIMULATED_ID_SPACE = range(100, 100_000)
+
+
+def prepare_directory(directory):
+    os.makedirs(directory, exist_ok=True)
+
+    participant_file = os.path.join(directory, "participantinfo.csv")
+    if not os.path.exists(participant_file):
+        with open(participant_file, "w") as file:
+            file.write("age,participant_number,session_number,trials_completed,seed,parts\n")
+
+
+if __name__ == "__main__":
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    directory = os.path.abspath(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DIRECTORY)
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    prepare_directory(directory)
+
+    for session in range(n_sessions):
+        start = time()
+        main(backend="simulation", directory=directory, seed=seed, id_space=SIMULATED_ID_SPACE)
+        print(f"Simulated session {session + 1} of {n_sessions} in {time() - start:.1f} s.")
@@ -0,0 +1,240 @@
+"""
+This file contains the functions necessary for
+running the experiment without a screen, keyboard or eyetracker,
+e.g. for regression tests and benchmarks.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+from collections import namedtuple
+from types import SimpleNamespace
+from gazebuffer import SAMPLE_RATE
+
+Key = namedtuple("Key", ["name", "rt"])
+GAZE_DRIFT = 0.1  # in pixels per sample, of simulated gaze
+MICROSACCADE_INTERVAL = (400, 1000)  # in ms between simulated microsaccades
+MICROSACCADE_AMPLITUDE = (10, 35)  # in pixels, about 0.2 to 0.8 degrees
+MICROSACCADE_DURATION = 20  # in ms
+
+
+class NullStimulus:
+    """
+    Stands in for any psychopy stimulus: remembers what it's given, draws nothing.
+    """
+
+    def __init__(self, win=None, text="", **kwargs) -> None:
+        self.win = win
+        self.text = text
+        self.__dict__.update(kwargs)
+
+    def draw(self):
+        pass
+
+
+# Stands in for `psychopy.visual` when creating the stimuli
+null_visual = SimpleNamespace(Circle=NullStimulus, Rect=NullStimulus, TextStim=NullStimulus)
+
+
+class NullWindow:
+    """
+    Stands in for a psychopy window. Every flip instantly moves the (virtual)
+    `clock` forward to the next refresh.
+    """
+
+    def __init__(self, monitor, clock) -> None:
+        self.size = monitor["resolution"]
+        self.color = [-0.5, -0.5, -0.5]
+        self.units = "pix"
+        self.frame_duration = 1 / monitor["Hz"]
+        self.clock = clock
+
+    def flip(self, clearBuffer=True):
+        return self.clock.next_refresh(self.frame_duration)
+
+
+class NullClock:
+    def reset(self):
+        pass
+
+
+class ScriptedKeyboard:
+    """
+    Stands in for a psychopy keyboard, acting like a participant who
+    presses a key `reaction_time()` seconds after being asked to, and
+    holds space for `hold_duration()` seconds whenever a response is asked for
+    (both drawn from `rng` by default).
+    They press 'q' once `quit_after[0]` responses have been given, then again
+    after `quit_after[1]` more responses, etc. (to stop practising).
+    """
+
+    def __init__(
+        self, clock, rng=None, hold_duration=None, reaction_time=None, quit_after=(2, 2)
+    ) -> None:
+        rng = rng or np.random.default_rng()
+        self.session_clock = clock
+        self.hold_duration = hold_duration or (lambda: float(rng.uniform(0.2, 1.6)))
+        self.reaction_time = reaction_time or (lambda: float(rng.uniform(0.2, 0.6)))
+        self.clock = NullClock()
+        self.release_time = None
+        self.responses = 0
+
+        # Quit after this many responses in total
+        self.quit_at = []
+        for n_responses in quit_after:
+            self.quit_at.append(n_responses + (self.quit_at[-1] if self.quit_at else 0))
+
+    def clearEvents(self):
+        pass
+
+    def getKeys(self, keyList=None, waitRelease=True):
+        if keyList and "q" in keyList and self.quit_at and self.responses >= self.quit_at[0]:
+            self.quit_at.pop(0)
+            return [Key("q", 0)]
+
+        return []
+
+    def waitKeys(self, keyList=None, waitRelease=True):
+        self.session_clock.wait(self.reaction_time())
+
+        # Start holding the key, which only matters if this is a response
+        self.release_time = self.session_clock.time() + self.hold_duration()
+
+        return [Key(keyList[0] if keyList else "space", 0)]
+
+    def getState(self, key):
+        if self.release_time is not None and self.session_clock.time() < self.release_time:
+            return True
+
+        if self.release_time is not None:
+            self.release_time = None
+            self.responses += 1
+
+        return False
+
+
+class SimulatedEyeLinker:
+    """
+    Stands in for an EyeLinker (see lib/eyelinker.py), tracking the gaze of someone
+    looking at the centre of the screen (making a microsaccade every so often) and keeping every message it's sent, with the
+    time it was sent at. When the .edf would be transferred, the samples of every
+    recording and the messages are written to an .asc file instead, formatted like
+    an .asc export of an .edf file. Any other method of an EyeLinker does nothing.
+    The tracker's time is `start` ms when the session starts.
+    """
+
+    def __init__(self, window, filename, eye, text_color=None, rng=None, start=0):
+        self.window = window
+        self.start = start
+        self.edf_filename = filename
+        self.eye = eye
+        self.text_color = text_color
+        self.resolution = tuple(window.size)
+        self.mock = True
+        self.messages = []
+        self.recordings = []  # start and end of every recording, in ms
+        self.last_sample = None
+
+        # Gaze that drifts a bit around the centre, repeated every 10 s
+        rng = rng or np.random.default_rng()
+        drift = np.cumsum(rng.normal(0, GAZE_DRIFT, (10_000, 2)), axis=0)
+
+        # With microsaccades in it, mostly horizontal and back toward the centre
+        profile = (1 - np.cos(np.linspace(0, np.pi, MICROSACCADE_DURATION)))[:, None] / 2
+        onset = int(rng.integers(*MICROSACCADE_INTERVAL))
+        while onset + MICROSACCADE_DURATION < len(drift):
+            angle = rng.normal(0, 0.3) + (np.pi if drift[onset, 0] > 0 else 0)
+            step = rng.uniform(*MICROSACCADE_AMPLITUDE) * np.array([np.cos(angle), np.sin(angle)])
+            drift[onset : onset + MICROSACCADE_DURATION] += profile * step
+            drift[onset + MICROSACCADE_DURATION :] += step
+            onset += MICROSACCADE_DURATION + int(rng.integers(*MICROSACCADE_INTERVAL))
+
+        drift -= np.linspace(0, 1, len(drift))[:, None] * drift[-1]
+        self.fixation = np.full((len(drift), 4), 1000.0)
+        self.fixation[:, 1:3] = np.divide(self.resolution, 2) + drift
+
+    def __getattr__(self, name):
+        # Like MockEyeLinker, without importing pylink and pygame for it
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        return _do_nothing
+
+    def read_samples(self, rate=SAMPLE_RATE):
+        """
+        Gaze samples (as for GazeBuffer) from the last one read up to now.
+        """
+        now = round(self.tracker_time())
+        first = now if self.last_sample is None else self.last_sample + 1000 // rate
+        self.last_sample = now
+
+        return self._samples(np.arange(first, now + 1, 1000 // rate))
+
+    def tracker_time(self):
+        # Messages and samples are timed in ms of the simulated session
+        return self.start + self.window.clock.time() * 1000
+
+    def start_recording(self):
+        # Recording is started again after calibrating, without stopping it first
+        if not self.recordings or self.recordings[-1][1] is not None:
+            self.recordings.append([round(self.tracker_time()), None])
+
+    def stop_recording(self):
+        if self.recordings and self.recordings[-1][1] is None:
+            self.recordings[-1][1] = round(self.tracker_time())
+
+    def send_message(self, msg):
+        self.messages.append((round(self.tracker_time()), msg))
+
+    def transfer_edf(self, new_filename=None):
+        filename = (new_filename or self.edf_filename)[:-4] + ".asc"
+        message_times = np.array([timestamp for timestamp, _ in self.messages], dtype=int)
+
+        # The gaze repeats, so every sample only needs its time formatted
+        rows = [f"\t{x:.1f}\t{y:.1f}\t{pupil:.1f}\t...\n" for _, x, y, pupil in self.fixation]
+
+        with open(filename, "w") as file:
+            n_written = 0
+            for start, end in self.recordings:
+                end = round(self.tracker_time()) if end is None else end
+                time = np.arange(start, end + 1)
+
+                # Messages sent in between recordings
+                while n_written < len(self.messages) and message_times[n_written] < start:
+                    file.write(f"MSG\t{self.messages[n_written][0]} {self.messages[n_written][1]}\n")
+                    n_written += 1
+
+                file.write(f"START\t{start} \t{self.eye}\tSAMPLES\tEVENTS\n")
+                file.write(
+                    f"SAMPLES\tGAZE\t{self.eye}\tRATE\t{SAMPLE_RATE:.2f}\tTRACKING\tCR\n"
+                )
+
+                # Every message right after the sample it was sent at
+                lines = [f"{t}{rows[t % len(rows)]}" for t in time.tolist()]
+                positions = np.searchsorted(time, message_times, side="right")
+                written_until = 0
+                for index in range(n_written, len(self.messages)):
+                    if message_times[index] > end:
+                        break
+                    file.writelines(lines[written_until : positions[index]])
+                    written_until = max(written_until, positions[index])
+                    file.write(f"MSG\t{self.messages[index][0]} {self.messages[index][1]}\n")
+                    n_written = index + 1
+
+                file.writelines(lines[written_until:])
+                file.write(f"END\t{end} \tSAMPLES\tEVENTS\tRES\t0.00\t0.00\n")
+
+            for timestamp, msg in self.messages[n_written:]:
+                file.write(f"MSG\t{timestamp} {msg}\n")
+
+        print(filename + " has been written.")
+
+    def _samples(self, time):
+        samples = self.fixation[time % len(self.fixation)]
+        samples[:, 0] = time
+        return samples
+
+
+def _do_nothing(*args, **kwargs):
+    pass
@@ -0,0 +1,175 @@
+"""
+This file contains the functions necessary for
+starting a session quickly: loading the modules (numpy, pandas and those of the experiment)
+while the experimenter is still entering participant details, and timing every phase
+(also against a baseline per computer, see benchmark.py).
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import threading
+import traceback
+from time import perf_counter
+
+# Window and display libraries (and what uses them), only to be imported on the main thread
+MAIN_THREAD_ONLY = ["psychopy", "pyglet", "pygame", "pylink"]
+# Kept per user rather than in the repository, as they belong to this computer
+BASELINE_FILE = os.path.join(
+    os.path.expanduser("~"), ".microsaccade_bias_duration", "startup_baselines.json"
+)
+TOLERANCE = 0.25  # how much slower than the baseline of this machine starting up may get
+
+
+class StartupTimer:
+    """
+    usage:
+
+       startup = StartupTimer()
+
+    At the end of every phase of starting up:
+
+       startup.phase("imports")
+
+    Then `startup.report()` gives how long every phase took, and the time to the first
+    screen: all of it except the phases in `waiting_for` (e.g. the experimenter typing).
+    """
+
+    def __init__(self, waiting_for=("participant details",)) -> None:
+        self.waiting_for = waiting_for
+        self.start = perf_counter()
+        self.last = self.start
+        self.phases = {}
+
+    def phase(self, name):
+        now = perf_counter()
+        self.phases[name] = now - self.last
+        self.last = now
+
+    def first_screen(self):
+        """
+        Seconds from the start until now, leaving out the phases in `waiting_for`.
+        """
+        waited = sum(self.phases.get(name, 0) for name in self.waiting_for)
+        return self.last - self.start - waited
+
+    def report(self):
+        lines = [f"Startup took {self.first_screen():.2f} s to the first screen:"]
+        for name, seconds in self.phases.items():
+            waiting = " (not counted)" if name in self.waiting_for else ""
+            lines.append(f"  {name:<28} {seconds:6.2f} s{waiting}")
+
+        return "\n".join(lines)
+
+
+def preload(modules):
+    """
+    Import `modules` on a separate thread, returns the thread. Importing them again
+    afterwards (e.g. with `from module import name`) is then immediate, or waits for
+    the thread if it's still busy with that module. Only imports happen on the thread,
+    windows are still opened and the eyetracker connected from the main thread.
+    None of the `modules` may be (or import) one of MAIN_THREAD_ONLY.
+    """
+    for module in modules:
+        if module.split(".")[0] in MAIN_THREAD_ONLY:
+            raise Exception(
+                f"Expected modules that can be imported on another thread, "
+                f"but received {module!r}, which must be imported on the main thread."
+            )
+
+    def load():
+        for module in modules:
+            try:
+                importlib.import_module(module)
+            except Exception:
+                # Imported again from the main thread, which will show the error
+                traceback.print_exc()
+                return
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+
+    return thread
+
+
+def time_first_screen(directory):
+    """
+    Time every step to the first screen in this process, which shouldn't have imported
+    anything yet: main.py up to its first screen with the simulation backend, then
+    what that leaves out, if it's installed: importing psychopy.visual and opening the
+    window (only when there's a display), and importing pylink (see lib/eyelinker.py).
+    Connecting to the tracker isn't timed, as that depends on the tracker.
+    Returns the seconds of every step, and their "total".
+    """
+    start = perf_counter()
+    import simulate
+    import main
+
+    simulate.prepare_directory(directory)
+    timer = main.main(backend="simulation", directory=directory, startup_only=True)
+    steps = {"main (simulation)": perf_counter() - start, **timer.phases}
+    left_out = {}
+
+    def step(name, function):
+        step_start = perf_counter()
+        result = function()
+        left_out[name] = perf_counter() - step_start
+        return result
+
+    if importlib.util.find_spec("psychopy"):
+        step("import psychopy.visual", lambda: importlib.import_module("psychopy.visual"))
+
+        from set_up import get_monitor_and_dir, get_settings
+
+        try:
+            settings = step(
+                "psychopy window and stimuli",
+                lambda: get_settings(get_monitor_and_dir(False)[0], directory),
+            )
+            settings["window"].close()
+        except Exception:
+            # No display to open a window on
+            traceback.print_exc()
+
+    if importlib.util.find_spec("pylink"):
+        step("import pylink", lambda: importlib.import_module("lib.eyelinker"))
+
+    return {**steps, **left_out, "total": steps["main (simulation)"] + sum(left_out.values())}
+
+
+def compare_with_baseline(
+    name, seconds, path=BASELINE_FILE, tolerance=TOLERANCE, machine=None, update=False
+):
+    """
+    Compare how many `seconds` benchmark `name` took with its baseline on this `machine`
+    (the computer's name by default) in `path`. The first time (or with `update`),
+    `seconds` is saved as the baseline. Raises if it's more than `tolerance` slower.
+    Returns the baseline.
+    """
+    machine = machine or platform.node()
+
+    baselines = {}
+    if os.path.exists(path):
+        with open(path) as file:
+            baselines = json.load(file)
+
+    baseline = baselines.get(machine, {}).get(name)
+    if baseline is None or update:
+        baselines.setdefault(machine, {})[name] = seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(baselines, file, indent=4, sort_keys=True)
+        return seconds
+
+    if seconds > baseline * (1 + tolerance):
+        raise Exception(
+            f"Expected {name} to take at most {tolerance:.0%} longer than the {baseline:.2f} s "
+            f"it took before on {machine}, but it took {seconds:.2f} s."
+        )
+
+    return baseline
@@ -6,64 +6,155 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025
 """
 
-from psychopy import visual
 
 DOT_SIZE = 0.1  # diameter of circle
 ECCENTRICITY = 6
 ITEM_SIZE = 1
+TEXT_OFFSET = 0.3  # vertical offset of cue and feedback text
+CUES = [1, 2]  # target items the cue can point to
+FIXATION_COLOURS = ["#eaeaea", [-1, -1, -1]]
 
 
-def show_text(input, window, pos=(0, 0), colour="#ffffff"):
-    textstim = visual.TextStim(
-        win=window, font="Courier New", text=input, color=colour, pos=pos, height=22
-    )
+def _colour_key(colour):
+    # Lists aren't hashable, so colours given as rgb values are stored as tuples
+    return colour if isinstance(colour, str) else tuple(colour)
 
-    textstim.draw()
 
+def _item_colour(position, order):
+    if position == "middle":
+        return [1, 1, 1]
 
-def draw_fixation_dot(settings, colour="#eaeaea"):
-    # Make fixation dot
-    fixation_dot = visual.Circle(
-        win=settings["window"],
-        units="pix",
-        radius=settings["deg2pix"](DOT_SIZE),
-        pos=(0, 0),
-        fillColor=colour,
-    )
-
-    fixation_dot.draw()
+    if order == 1:
+        return [(rgb_value / 128 - 1) for rgb_value in [238, 104, 60]]
+    elif order == 2:
+        return [(rgb_value / 128 - 1) for rgb_value in [101, 148, 14]]
+    else:
+        raise Exception(f"Expected order 1 or 2, but received {order!r}.")
 
 
-def draw_one_stimulus(position, settings, order=0):
-    # Check input
+def _item_position(position, deg2pix):
     if position == "left":
-        pos = (-settings["deg2pix"](ECCENTRICITY), 0)
+        return (-deg2pix(ECCENTRICITY), 0)
     elif position == "right":
-        pos = (settings["deg2pix"](ECCENTRICITY), 0)
+        return (deg2pix(ECCENTRICITY), 0)
     elif position == "middle":
-        pos = (0, 0)
-        colour = [1, 1, 1]
+        return (0, 0)
     else:
         raise Exception(f"Expected position 'left' or 'right', but received {position!r}.")
-    
-    if position != "middle":
-        if order == 1:
-            colour = [(rgb_value / 128 - 1) for rgb_value in [238, 104, 60]]
-        elif order == 2:
-            colour = [(rgb_value / 128 - 1) for rgb_value in [101, 148, 14]]
-        else:
-            raise Exception(f"Expected order 1 or 2, but received {order!r}.")
-
-    item = visual.Rect(
-        win=settings["window"],
-        units="pix",
-        width=settings["deg2pix"](ITEM_SIZE),
-        height=settings["deg2pix"](ITEM_SIZE),
-        pos=pos,
-        fillColor=colour,
-        #fillColor=[1, 1, 1],
+
+
+def create_stimuli(window, deg2pix, visual=None):
+    """
+    Build every stimulus object used during the experiment once,
+    so the drawing functions below only have to look them up.
+    `visual` is the module (or stand-in for it) the objects are made with,
+    psychopy.visual by default.
+    """
+    if visual is None:
+        from psychopy import visual
+
+    stimuli = {"visual": visual}
+
+    stimuli["fixation_dots"] = {
+        _colour_key(colour): visual.Circle(
+            win=window,
+            units="pix",
+            radius=deg2pix(DOT_SIZE),
+            pos=(0, 0),
+            fillColor=colour,
+        )
+        for colour in FIXATION_COLOURS
+    }
+
+    stimuli["items"] = {
+        (position, order): visual.Rect(
+            win=window,
+            units="pix",
+            width=deg2pix(ITEM_SIZE),
+            height=deg2pix(ITEM_SIZE),
+            pos=_item_position(position, deg2pix),
+            fillColor=_item_colour(position, order),
+        )
+        for position, order in [
+            ("left", 1),
+            ("left", 2),
+            ("right", 1),
+            ("right", 2),
+            ("middle", 0),
+        ]
+    }
+
+    stimuli["texts"] = {
+        (pos, "#ffffff"): _create_text(visual, window, pos, "#ffffff")
+        for pos in [(0, 0), (0, deg2pix(TEXT_OFFSET)), (0, -deg2pix(TEXT_OFFSET))]
+    }
+
+    # Every cue has its own text, and the feedback as well, so the text drawn right
+    # before the cue's onset (and its trigger) never has to be laid out again
+    stimuli["cues"] = {
+        str(cue): _create_text(visual, window, (0, deg2pix(TEXT_OFFSET)), "#ffffff", str(cue))
+        for cue in CUES
+    }
+    stimuli["feedback"] = _create_text(visual, window, (0, deg2pix(TEXT_OFFSET)), "#ffffff")
+
+    return stimuli
+
+
+def _create_text(visual, window, pos, colour, text=""):
+    return visual.TextStim(
+        win=window, font="Courier New", text=text, color=colour, pos=pos, height=22
     )
 
+
+def _draw_text(textstim, input):
+    # Changing the text forces a new layout, so only do so when needed
+    input = str(input)
+    if textstim.text != input:
+        textstim.text = input
+
+    textstim.draw()
+
+
+def show_text(input, settings, pos=(0, 0), colour="#ffffff"):
+    texts = settings["stimuli"]["texts"]
+    key = (tuple(pos), _colour_key(colour))
+
+    # Text in an unexpected place or colour gets its own object, built only once
+    if key not in texts:
+        texts[key] = _create_text(
+            settings["stimuli"]["visual"], settings["window"], pos, colour
+        )
+
+    _draw_text(texts[key], input)
+
+
+def draw_fixation_dot(settings, colour="#eaeaea"):
+    fixation_dots = settings["stimuli"]["fixation_dots"]
+    key = _colour_key(colour)
+
+    if key not in fixation_dots:
+        fixation_dots[key] = settings["stimuli"]["visual"].Circle(
+            win=settings["window"],
+            units="pix",
+            radius=settings["deg2pix"](DOT_SIZE),
+            pos=(0, 0),
+            fillColor=colour,
+        )
+
+    fixation_dots[key].draw()
+
+
+def draw_one_stimulus(position, settings, order=0):
+    try:
+        item = settings["stimuli"]["items"][
+            (position, 0 if position == "middle" else order)
+        ]
+    except KeyError:
+        # Give the same errors as before the items were built in advance
+        _item_position(position, settings["deg2pix"])
+        _item_colour(position, order)
+        raise
+
     item.draw()
 
 
@@ -74,13 +165,14 @@ def create_stimulus_frame(item_position, item_order, settings):
 
 def create_cue_frame(target_item, settings):
     draw_fixation_dot(settings)
-    show_text(target_item, settings["window"], pos=(0, settings["deg2pix"](0.3)))
+
+    cues = settings["stimuli"]["cues"]
+    if str(target_item) not in cues:
+        raise Exception(f"Expected a target item in {CUES}, but received {target_item!r}.")
+
+    cues[str(target_item)].draw()
 
 
 def create_feedback_frame(target_duration, response_duration, main_feedback, settings):
     draw_fixation_dot(settings)
-    show_text(
-        f"{main_feedback}",
-        settings["window"],
-        (0, settings["deg2pix"](0.3)),
-    )
+    _draw_text(settings["stimuli"]["feedback"], main_feedback)
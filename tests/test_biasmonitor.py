@@ -0,0 +1,60 @@
+import numpy as np
+
+from background import BackgroundWorker
+from biasmonitor import BiasMonitor
+from gazebuffer import GazeBuffer
+
+CENTRE = 500
+
+
+class Gaze:
+    # Fixating with a bit of noise, with a 20 px microsaccade to the right at `saccade`
+    def __init__(self, saccade) -> None:
+        self.saccade = saccade
+        self.rng = np.random.default_rng(0)
+        self.last = 0
+        self.now = 0
+
+    def __call__(self):
+        times = np.arange(self.last + 1, self.now + 1)
+        self.last = self.now
+
+        x = CENTRE + self.rng.normal(0, 0.1, len(times))
+        x += 20 * np.clip((times - self.saccade) / 20, 0, 1)
+        return np.column_stack([times, x, np.full(len(times), CENTRE), np.ones(len(times))])
+
+
+def test_microsaccade_after_the_cue_is_counted_toward_the_target():
+    samples = Gaze(saccade=3_350)
+    gaze = GazeBuffer(samples, threaded=False)
+    gaze.start()
+    worker = BackgroundWorker()
+    bias_monitor = BiasMonitor(gaze, {"background": worker, "deg2pix": lambda deg: deg * 40})
+
+    bias_monitor.start_block(1)
+    samples.now = 3_000
+    bias_monitor.cue("right")
+    samples.now = 6_000
+    bias_monitor.update()
+    worker.wait()
+
+    assert bias_monitor.trials[1] == 1
+    assert bias_monitor.counts[1][0].tolist() == [0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+    assert bias_monitor.counts[1][1].sum() == 0
+
+
+def test_gaze_from_before_the_block_is_not_looked_at():
+    samples = Gaze(saccade=1_000)
+    gaze = GazeBuffer(samples, threaded=False)
+    gaze.start()
+    worker = BackgroundWorker()
+    bias_monitor = BiasMonitor(gaze, {"background": worker, "deg2pix": lambda deg: deg * 40})
+
+    # The microsaccade was made during the break
+    samples.now = 2_000
+    bias_monitor.start_block(1)
+    samples.now = 4_000
+    bias_monitor.update()
+    worker.wait()
+
+    assert len(bias_monitor.onsets) == 0
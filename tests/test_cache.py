@@ -0,0 +1,53 @@
+import os
+
+from analysis.cache import Cache
+
+
+def write(text):
+    def compute(entry):
+        with open(os.path.join(entry, "product.txt"), "w") as file:
+            file.write(text)
+
+    return compute
+
+
+def test_product_is_only_computed_once_per_input_and_parameters(tmp_path):
+    cache = Cache(tmp_path)
+
+    key, entry = cache.fetch("stage", ["input"], {"a": 1}, write("first"))
+    again, _ = cache.fetch("stage", ["input"], {"a": 1}, write("second"))
+    other, _ = cache.fetch("stage", ["input"], {"a": 2}, write("third"))
+
+    assert again == key
+    assert other != key
+    assert cache.computed == ["stage", "stage"]
+    with open(os.path.join(entry, "product.txt")) as file:
+        assert file.read() == "first"
+
+
+def test_file_hash_follows_the_contents(tmp_path):
+    cache = Cache(tmp_path / "cache")
+    path = tmp_path / "data.csv"
+    path.write_text("1,2\n")
+    first = cache.file_hash(path)
+
+    assert cache.file_hash(path) == first
+
+    path.write_text("1,3\n")
+    os.utime(path, ns=(0, 10**9))
+    assert cache.file_hash(path) != first
+
+
+def test_fetching_never_evicts_but_evict_removes_the_least_recently_used(tmp_path):
+    cache = Cache(tmp_path, max_size=0)
+    _, old = cache.fetch("stage", ["old"], {}, write("x" * 8))
+    os.utime(old, (0, 0))
+    _, new = cache.fetch("stage", ["new"], {}, write("y" * 8))
+
+    assert os.path.isdir(old)
+
+    # Room for one of them
+    cache.max_size = cache.size() // 2
+    cache.evict()
+    assert not os.path.isdir(old)
+    assert os.path.isdir(new)
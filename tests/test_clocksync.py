@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from clock import VirtualClock
+from clocksync import ClockSync, load_clock_sync, to_tracker_time
+
+
+class DriftingTracker:
+    # A tracker whose clock started 5 s before ours and runs 20 ppm fast
+    def __init__(self, clock) -> None:
+        self.clock = clock
+        self.messages = []
+
+    def tracker_time(self):
+        return (self.clock.time() + 5) * 1000 * (1 + 20e-6)
+
+    def send_message(self, message):
+        self.messages.append(message)
+
+
+def test_fit_finds_offset_and_drift(tmp_path):
+    clock = VirtualClock(start=100)
+    tracker = DriftingTracker(clock)
+    clock_sync = ClockSync(clock)
+    for _ in range(10):
+        clock_sync.sync(tracker)
+        clock.wait(60)
+
+    fit = clock_sync.fit()
+    assert fit["drift_in_ppm"] == pytest.approx(20)
+    assert fit["n_syncs"] == 10
+    assert tracker.messages[0] == "SYNC 100.000000"
+
+    clock_sync.save(tmp_path / "clocksync.json", first_trial=1)
+    saved = load_clock_sync(tmp_path / "clocksync.json")
+    assert saved["first_trial"] == 1
+    assert to_tracker_time(400, saved) == pytest.approx(405_000 * (1 + 20e-6))
+
+
+def test_saving_a_single_sync_keeps_it_without_a_fit(tmp_path):
+    clock = VirtualClock()
+    clock_sync = ClockSync(clock)
+    clock_sync.sync(DriftingTracker(clock))
+
+    clock_sync.save(tmp_path / "clocksync.json")
+    with open(tmp_path / "clocksync.json") as file:
+        saved = json.load(file)
+
+    assert "tracker_ms_per_s" not in saved
+    assert len(saved["syncs"]) == 1
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.epochs import Epochs, assign_to_epochs, epoch_session
+
+
+def make_gaze(messages, n_samples=10_000):
+    return {
+        "time": np.arange(n_samples),
+        "x": np.arange(n_samples, dtype=float),
+        "y": np.zeros(n_samples),
+        "pupil": np.ones(n_samples),
+        "rate": 1000,
+        "messages": np.array(messages, dtype=[("time", np.int64), ("text", "U30")]),
+    }
+
+
+def test_trials_are_matched_to_their_cue_triggers():
+    gaze = make_gaze([(1000, "trig11"), (1500, "trig31"), (4000, "trig12"), (4500, "trig32")])
+    trials = pd.DataFrame({"condition_code": [31, 32]})
+
+    trials, epochs, time = epoch_session(gaze, trials, window=(-100, 200))
+
+    assert trials["event_time"].tolist() == [1500, 4500]
+    assert epochs["x"][1][0] == 4400
+    assert time[0] == -100
+
+
+def test_trigger_of_an_unsaved_last_trial_is_dropped():
+    # Quit after the cue of the third trial, which was never saved
+    gaze = make_gaze([(1500, "trig31"), (4500, "trig32"), (7500, "trig31")])
+    trials = pd.DataFrame({"condition_code": [31, 32]})
+
+    trials, _, _ = epoch_session(gaze, trials)
+
+    assert trials["event_time"].tolist() == [1500, 4500]
+
+
+def test_missing_triggers_fail():
+    gaze = make_gaze([(1500, "trig31")])
+    trials = pd.DataFrame({"condition_code": [31, 32, 31]})
+
+    with pytest.raises(Exception, match="Expected 3 cue_onset triggers"):
+        epoch_session(gaze, trials)
+
+
+def test_trigger_of_the_trial_a_crash_stopped_is_dropped():
+    # Crashed during the second trial, resumed from it
+    gaze = make_gaze(
+        [(1500, "trig31"), (4500, "trig32"), (6000, "resumed after trial 1"), (7500, "trig32")]
+    )
+    trials = pd.DataFrame({"condition_code": [31, 32]})
+
+    trials, _, _ = epoch_session(gaze, trials)
+
+    assert trials["event_time"].tolist() == [1500, 7500]
+
+
+def test_triggers_are_matched_to_saved_trials_by_their_number():
+    # Crashed during the third trial, with the second one not saved yet, resumed from it
+    gaze = make_gaze(
+        [(1000, "TRIALID 1"), (1500, "trig31"), (4000, "TRIALID 2"), (4500, "trig32"),
+         (7000, "TRIALID 3"), (7500, "trig31"), (8000, "resumed after trial 1"),
+         (8500, "TRIALID 2"), (9000, "trig32")]
+    )
+    trials = pd.DataFrame({"trial_number": [1, 2], "condition_code": [31, 32]})
+
+    trials, _, _ = epoch_session(gaze, trials)
+
+    assert trials["event_time"].tolist() == [1500, 9000]
+
+
+def test_saved_trial_without_a_trigger_fails():
+    gaze = make_gaze([(1000, "TRIALID 1"), (1500, "trig31"), (4000, "TRIALID 2")])
+    trials = pd.DataFrame({"trial_number": [1, 2], "condition_code": [31, 32]})
+
+    with pytest.raises(Exception, match=r"none for trials \[2\]"):
+        epoch_session(gaze, trials)
+
+
+def test_epochs_are_cut_off_at_the_edges_of_the_recording():
+    epochs = Epochs(np.arange(10.0), np.arange(10), [-3, 2, 8, -20, 15], (0, 5), 1000)
+
+    assert epochs[0].tolist() == [0, 1]
+    assert epochs[1].tolist() == [2, 3, 4, 5, 6]
+    assert epochs[2].tolist() == [8, 9]
+    assert len(epochs[3]) == 0
+    assert len(epochs[4]) == 0
+    assert epochs.complete.tolist() == [False, True, False, False, False]
+
+
+def test_epochs_outside_the_recording_are_padded_with_nan():
+    array = Epochs(np.arange(10.0), np.arange(10), [-3, 8, -20, 15], (0, 5), 1000).to_array()
+
+    np.testing.assert_array_equal(array[0], [np.nan, np.nan, np.nan, 0, 1])
+    np.testing.assert_array_equal(array[1], [8, 9, np.nan, np.nan, np.nan])
+    assert np.isnan(array[2:]).all()
+
+
+def test_epochs_across_a_gap_only_get_the_samples_of_their_time():
+    # Recording stopped from 5 to 105 ms (e.g. to calibrate)
+    time = np.concatenate([np.arange(5), np.arange(105, 110)])
+    epochs = Epochs(time.astype(float), time, [3, 104], (-1, 3), 1000)
+
+    assert epochs[0].tolist() == [2, 3, 4]
+    assert epochs[1].tolist() == [105, 106]
+    assert epochs.complete.tolist() == [False, False]
+    np.testing.assert_array_equal(epochs.to_array()[1], [np.nan, np.nan, 105, 106])
+
+
+def test_epochs_at_2000_hz_are_cut_by_time():
+    time = np.arange(0, 10, 0.5)
+    epochs = Epochs(time, time, [5], (-1, 1), 2000)
+
+    assert epochs[0].tolist() == [4, 4.5, 5, 5.5]
+    assert epochs.complete.tolist() == [True]
+
+
+def test_trials_are_marked_when_their_epoch_crosses_a_gap():
+    gaze = make_gaze([(1500, "trig31"), (4500, "trig32")])
+    kept = (gaze["time"] < 4000) | (gaze["time"] >= 4600)
+    gaze.update({name: gaze[name][kept] for name in ["time", "x", "y", "pupil"]})
+    trials = pd.DataFrame({"condition_code": [31, 32]})
+
+    trials, epochs, _ = epoch_session(gaze, trials)
+
+    assert trials["epoch_complete"].tolist() == [True, False]
+    assert epochs["x"][1][0] == 4600
+
+
+def test_times_are_assigned_to_the_epoch_they_fall_in():
+    epoch, relative = assign_to_epochs([400, 1200, 5000, 7000], np.array([1000, 6000]))
+
+    assert epoch.tolist() == [-1, 0, -1, 1]
+    assert relative[1] == 200
+    assert relative[3] == 1000
@@ -0,0 +1,28 @@
+import numpy as np
+
+from analysis.gaze import convert, load_gaze
+
+# Part of an .asc export of a recording at 2000 Hz, with a missing sample
+ASC_2000_HZ = """\
+START\t2046518 \tRIGHT\tSAMPLES\tEVENTS
+SAMPLES\tGAZE\tRIGHT\tRATE\t2000.00\tTRACKING\tCR\tFILTER\t2
+2046518\t  960.1\t  540.2\t 1012.0\t.....
+2046518.5\t  960.3\t  540.1\t 1011.0\t.....
+MSG\t2046519 trig31
+2046519\t   .\t   .\t    0.0\t.....
+2046519.5\t  961.0\t  539.8\t 1010.0\t.....
+END\t2046519.5 \tSAMPLES\tEVENTS\tRES\t0.00\t0.00
+"""
+
+
+def test_half_ms_timestamps_at_2000_hz_are_kept(tmp_path):
+    path = tmp_path / "1_37.asc"
+    path.write_text(ASC_2000_HZ)
+
+    gaze = load_gaze(convert(str(path)))
+
+    assert gaze["rate"] == 2000
+    np.testing.assert_array_equal(gaze["time"], [2046518, 2046518.5, 2046519, 2046519.5])
+    np.testing.assert_array_equal(gaze["x"], np.float32([960.1, 960.3, np.nan, 961.0]))
+    assert gaze["messages"]["time"].tolist() == [2046519]
+    assert gaze["messages"]["text"].tolist() == ["trig31"]
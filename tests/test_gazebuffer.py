@@ -0,0 +1,96 @@
+import sys
+import threading
+from time import sleep
+from types import SimpleNamespace
+
+import numpy as np
+
+from eyetracker import read_link_samples
+from gazebuffer import GazeBuffer
+
+
+class Samples:
+    # Hands out the samples up to the time set, 1 per ms
+    def __init__(self) -> None:
+        self.last = 0
+        self.now = 0
+
+    def __call__(self):
+        times = np.arange(self.last + 1, self.now + 1)
+        self.last = self.now
+        return [(time, time / 10, 0, 1000) for time in times]
+
+
+def test_latest_samples_are_contiguous_after_wrapping_around():
+    samples = Samples()
+    gaze = GazeBuffer(samples, duration=100, threaded=False)
+    gaze.start()
+
+    samples.now = 250
+    latest = gaze.latest()
+
+    assert latest[:, 0].tolist() == list(range(151, 251))
+    assert gaze.latest(10)[:, 0].tolist() == list(range(241, 251))
+
+
+def test_since_gives_the_new_samples_and_the_total():
+    samples = Samples()
+    gaze = GazeBuffer(samples, duration=100, threaded=False)
+    gaze.start()
+
+    samples.now = 30
+    _, total = gaze.since(0)
+    samples.now = 45
+    new, total = gaze.since(total)
+
+    assert new[:, 0].tolist() == list(range(31, 46))
+    assert total == 45
+
+
+class LinkedTracker:
+    # Like pylink's EyeLink, with `n_samples` queued, remembering when the link was locked
+    def __init__(self, link, n_samples) -> None:
+        self.link = link
+        self.queued = list(range(1, n_samples + 1))
+        self.locked_in_calls = []
+        self.locked_in_between = []
+
+    def getNextData(self):
+        self.locked_in_calls.append(self.link.locked())
+        return 200 if self.queued else 0
+
+    def getFloatData(self):
+        self.locked_in_calls.append(self.link.locked())
+        time = self.queued.pop(0)
+        eye = SimpleNamespace(getGaze=lambda: (960.0, 540.0), getPupilSize=lambda: 1000.0)
+
+        def right_eye():
+            self.locked_in_between.append(self.link.locked())
+            return eye
+
+        return SimpleNamespace(getTime=lambda: time, getRightEye=right_eye)
+
+
+def test_link_is_only_locked_for_every_call_to_the_tracker(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pylink", SimpleNamespace(SAMPLE_TYPE=200, MISSING_DATA=-1))
+    link = threading.Lock()
+    tracker = LinkedTracker(link, 50)
+
+    samples = read_link_samples(SimpleNamespace(tracker=tracker, eye="RIGHT"), link)
+
+    assert [sample[0] for sample in samples] == list(range(1, 51))
+    assert all(tracker.locked_in_calls)
+    assert not any(tracker.locked_in_between)
+
+
+def test_reading_in_the_background_gets_every_sample():
+    samples = Samples()
+    gaze = GazeBuffer(samples, duration=100)
+    gaze.start()
+
+    samples.now = 50
+    while gaze.n_samples < 50:
+        sleep(0.001)
+    gaze.stop()
+
+    assert gaze.latest()[-1, 0] == 50
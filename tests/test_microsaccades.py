@@ -0,0 +1,34 @@
+import numpy as np
+
+from analysis.microsaccades import compute_velocity, detect_microsaccades
+
+
+def fixation(time, saccades=()):
+    # Noisy fixation, with a 20 px step to the right in 20 ms at every time in `saccades`
+    x = 500 + np.random.default_rng(0).normal(0, 0.1, len(time))
+    for onset in saccades:
+        x += 20 * np.clip((time - onset) / 20, 0, 1)
+    return x, np.full(len(time), 500.0)
+
+
+def test_microsaccade_is_found_with_its_size_and_direction():
+    time = np.arange(2_000)
+    x, y = fixation(time, saccades=[1_000])
+
+    microsaccades = detect_microsaccades(time, x, y, pixels_per_degree=40)
+
+    assert len(microsaccades["onset"]) == 1
+    assert 990 <= microsaccades["onset"][0] <= 1_005
+    assert microsaccades["amplitude"][0] > 0.4
+    assert abs(microsaccades["direction"][0]) < 5
+
+
+def test_nothing_is_found_across_a_gap_in_the_recording():
+    # Recorded at 500 Hz, stopped for 30 s and 30 px further right when started again
+    time = np.concatenate([np.arange(0, 4_000, 2), np.arange(34_000, 38_000, 2)])
+    x, y = fixation(time)
+    x[2_000:] += 30
+
+    assert len(detect_microsaccades(np.arange(0, 8_000, 2), x, y, rate=500)["onset"]) == 1
+    assert len(detect_microsaccades(time, x, y, rate=500)["onset"]) == 0
+    assert np.isnan(compute_velocity(x, y, 500, time)[0, 1_998:2_002]).all()
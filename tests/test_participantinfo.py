@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from participantinfo import ParticipantNumbers
+
+
+def test_every_free_number_is_drawn_once():
+    numbers = ParticipantNumbers([12, 15], np.random.default_rng(0), range(10, 20))
+    drawn = [numbers.draw() for _ in range(8)]
+
+    assert sorted(drawn) == [10, 11, 13, 14, 16, 17, 18, 19]
+    assert len(numbers) == 0
+
+
+def test_same_seed_draws_the_same_numbers():
+    def draw(seed):
+        numbers = ParticipantNumbers([], np.random.default_rng(seed))
+        return [numbers.draw() for _ in range(5)]
+
+    assert draw(3) == draw(3)
+
+
+def test_drawing_from_a_full_space_raises():
+    numbers = ParticipantNumbers(range(10, 20), np.random.default_rng(0), range(10, 20))
+
+    with pytest.raises(Exception, match="all of them are used"):
+        numbers.draw()
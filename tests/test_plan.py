@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from plan import N_CONDITIONS, create_session_plan, get_trial_characteristics
+from randomness import create_random_streams
+
+
+def plan_for(seed, **kwargs):
+    return create_session_plan(4, 40, 240, create_random_streams(seed)[1], **kwargs)
+
+
+def longest_run(values):
+    longest = run = 1
+    for previous, value in zip(values, values[1:]):
+        run = run + 1 if value == previous else 1
+        longest = max(longest, run)
+    return longest
+
+
+def test_same_seed_gives_the_same_plan():
+    np.testing.assert_array_equal(plan_for(7), plan_for(7))
+    assert not np.array_equal(plan_for(7), plan_for(8))
+
+
+def test_every_block_has_every_condition_equally_often():
+    plan = plan_for(7)
+
+    for block in range(1, 5):
+        codes = plan["condition_code"][plan["block"] == block]
+        _, counts = np.unique(codes, return_counts=True)
+        assert counts.tolist() == [40 // N_CONDITIONS] * N_CONDITIONS
+
+
+@pytest.mark.parametrize("max_run_length", [2, 4])
+def test_target_is_never_on_the_same_side_too_often_in_a_row(max_run_length):
+    plan = plan_for(7, max_run_length=max_run_length)
+
+    for block in range(1, 5):
+        sides = [
+            get_trial_characteristics(trial)["target_position"]
+            for trial in plan[plan["block"] == block]
+        ]
+        assert longest_run(sides) <= max_run_length
+
+
+def test_impossible_run_length_raises_instead_of_shuffling_forever():
+    with pytest.raises(ValueError, match="runs longer than 1"):
+        plan_for(7, max_run_length=1)
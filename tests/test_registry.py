@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from participantinfo import get_participant_details, save_trials_completed, start_next_part
+from registry import ParticipantRegistry, read_participants
+from simulate import SIMULATED_ID_SPACE
+
+
+def new_session(directory, seed=0):
+    return get_participant_details(directory, 25, np.random.default_rng(seed), seed)
+
+
+def test_sessions_get_their_own_number_and_participant(tmp_path):
+    for seed in range(3):
+        new_session(tmp_path, seed)
+    save_trials_completed(tmp_path, 2, 640)
+
+    participants = read_participants(tmp_path)
+
+    assert participants.session_number.tolist() == [1, 2, 3]
+    assert participants.participant_number.nunique() == 3
+    assert participants.trials_completed.tolist()[1] == "640"
+
+
+def test_more_simulated_sessions_than_real_participant_numbers_fit(tmp_path):
+    for seed in range(100):
+        get_participant_details(tmp_path, 0, np.random.default_rng(seed), seed, SIMULATED_ID_SPACE)
+
+    assert read_participants(tmp_path).participant_number.nunique() == 100
+
+
+def test_every_resume_starts_a_new_part(tmp_path):
+    new_session(tmp_path)
+
+    assert [start_next_part(tmp_path, 1) for _ in range(2)] == [2, 3]
+    assert read_participants(tmp_path).parts.tolist() == ["3"]
+
+
+def test_compacting_writes_the_log_into_the_table(tmp_path):
+    registry = ParticipantRegistry(tmp_path, compact_after=4)
+    with registry.locked():
+        for session in range(1, 4):
+            registry.append(
+                {"age": 25, "participant_number": 10 + session, "session_number": session,
+                 "seed": "0"}
+            )
+        before = registry.read()
+        registry.append({"session_number": 1, "trials_completed": "800"})
+
+    assert (tmp_path / "participantinfo.log").read_text() == ""
+    after = registry.read()
+    assert after.participant_number.tolist() == before.participant_number.tolist()
+    assert after.trials_completed.tolist()[0] == "800"
+
+
+def test_change_cut_off_by_a_crash_is_skipped(tmp_path):
+    new_session(tmp_path)
+    with open(tmp_path / "participantinfo.log", "a") as file:
+        file.write('{"session_number": 1, "trials_comp')
+
+    save_trials_completed(tmp_path, 1, 12)
+    participants = read_participants(tmp_path)
+
+    assert participants.trials_completed.tolist() == ["12"]
+
+
+def test_registry_stays_locked_while_another_session_uses_it(tmp_path):
+    registry = ParticipantRegistry(tmp_path)
+
+    with registry.locked():
+        with pytest.raises(Exception, match="another session kept it locked"):
+            with ParticipantRegistry(tmp_path).locked(timeout=0.1):
+                pass
+
+    with registry.locked(timeout=0.1):
+        pass
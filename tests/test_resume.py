@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from eyetracker import get_edf_filename
+from registry import read_participants
+from simulate import prepare_directory
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a simulated session that's killed (without cleaning up) after `crash_after` trials
+SESSION = """
+import os
+import sys
+import trial
+from main import main
+
+crash_after = int(sys.argv[3])
+single_trial = trial.single_trial
+
+def crashing_trial(**kwargs):
+    global crash_after
+    if crash_after == 0:
+        os._exit(1)
+    crash_after -= 1
+    return single_trial(**kwargs)
+
+trial.single_trial = crashing_trial
+main(backend="simulation", directory=sys.argv[1], seed=1, resume=int(sys.argv[2]) or None)
+"""
+
+
+def run_session(directory, resume=0, crash_after=-1):
+    return subprocess.run(
+        [sys.executable, "-c", SESSION, str(directory), str(resume), str(crash_after)],
+        cwd=ROOT,
+        capture_output=True,
+    ).returncode
+
+
+def test_session_resumed_after_a_hard_crash_is_recorded_in_a_new_part(tmp_path):
+    prepare_directory(tmp_path)
+
+    assert run_session(tmp_path, crash_after=40) == 1
+
+    # Nothing was transferred from the tracker, so only the registry knows about part 1
+    participant = read_participants(tmp_path).participant_number.iloc[-1]
+    assert not list(tmp_path.glob("*.asc"))
+
+    assert run_session(tmp_path, resume=1) == 0
+
+    assert read_participants(tmp_path).parts.tolist() == ["2"]
+    assert not (tmp_path / get_edf_filename(participant, 1).replace(".edf", ".asc")).exists()
+    assert (tmp_path / get_edf_filename(participant, 1, 2).replace(".edf", ".asc")).exists()
+
+    trials = pd.read_csv(tmp_path / "data_session_1.csv")
+    assert trials.trial_number.tolist() == list(range(1, len(trials) + 1))
+
+    # Only the triggers of saved trials, each trial's once
+    triggers = pd.read_csv(tmp_path / "triggers_session_1.csv")
+    assert set(triggers.trial_number) <= set(trials.trial_number)
+    assert triggers.groupby("trial_number").event.agg(lambda events: events.is_unique).all()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from startup import StartupTimer, compare_with_baseline, preload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_preloaded_modules_never_import_main_thread_libraries():
+    # In a new process, so nothing was imported yet
+    code = (
+        "import sys, main, startup; startup.preload(main.MODULES).join(); "
+        "print(all(m in sys.modules for m in main.MODULES), "
+        "sorted({m.split('.')[0] for m in sys.modules} & set(startup.MAIN_THREAD_ONLY)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.strip() == "True []"
+
+
+def test_preloading_main_thread_libraries_raises():
+    with pytest.raises(Exception, match="psychopy.visual"):
+        preload(["numpy", "psychopy.visual"])
+
+
+def test_waiting_for_the_experimenter_is_not_counted():
+    startup = StartupTimer()
+    startup.phases = {"participant details": 20.0, "imports": 1.5}
+    startup.last = startup.start + 21.5
+
+    assert startup.first_screen() == pytest.approx(1.5)
+    assert "(not counted)" in startup.report()
+
+
+def test_startup_is_compared_with_the_baseline_of_the_same_computer(tmp_path):
+    path = tmp_path / "baselines.json"
+
+    assert compare_with_baseline("startup", 2.0, path, machine="lab") == 2.0
+    assert compare_with_baseline("startup", 2.4, path, machine="lab") == 2.0
+    assert compare_with_baseline("startup", 4.0, path, machine="laptop") == 4.0
+
+    with pytest.raises(Exception, match="at most 25% longer than the 2.00 s"):
+        compare_with_baseline("startup", 2.6, path, machine="lab")
+
+    assert compare_with_baseline("startup", 2.6, path, machine="lab", update=True) == 2.6
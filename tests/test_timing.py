@@ -0,0 +1,133 @@
+import math
+
+import pytest
+
+from response import get_shown_duration
+from timing import FlipRecorder
+
+REFRESH_RATE = 100
+
+
+class ScriptedWindow:
+    # Flips at the given times, in s
+    def __init__(self, times) -> None:
+        self.times = iter(times)
+
+    def flip(self):
+        return next(self.times)
+
+
+def record(times, screens, refresh_rate=REFRESH_RATE):
+    """
+    Flip once per time, starting the screens at the given (flip number, arguments).
+    """
+    flips = FlipRecorder(ScriptedWindow(times), refresh_rate, max_duration=1)
+    screens = dict(screens)
+    for n in range(len(times)):
+        if n in screens:
+            flips.start_screen(*screens[n][:2], **screens[n][2])
+        flips.flip()
+
+    return flips
+
+
+def test_summary_of_screens_without_dropped_frames():
+    flips = record(
+        [0.00, 0.01, 0.02, 0.03, 0.04],
+        [(0, ("ITI", 2, {})), (2, ("stimulus", 2, {})), (4, ("cue", None, {}))],
+    )
+    report = flips.summarise()
+
+    assert report["ITI_requested_in_ms"] == 20
+    assert report["ITI_measured_in_ms"] == 20
+    assert report["dropped_frames_stimulus"] == 0
+    assert report["dropped_frames"] == 0
+    assert report["frame_jitter_in_ms"] == pytest.approx(0, abs=1e-6)
+
+
+def test_dropped_frames_are_counted_per_screen():
+    # The second flip of the stimulus came two refreshes late
+    flips = record(
+        [0.00, 0.01, 0.02, 0.05, 0.06],
+        [(0, ("ITI", 2, {})), (2, ("stimulus", 2, {})), (4, ("cue", None, {}))],
+    )
+    report = flips.summarise()
+
+    assert report["dropped_frames_ITI"] == 0
+    assert report["dropped_frames_stimulus"] == 2
+    assert report["stimulus_measured_in_ms"] == 40
+    assert report["dropped_frames"] == 2
+
+
+def test_waiting_on_screens_that_are_not_refreshed_isnt_dropping_frames():
+    # The participant took 2 s to start responding after the prompt
+    flips = record(
+        [0.00, 0.01, 2.01, 2.02, 2.03],
+        [
+            (0, ("ITI", 1, {})),
+            (1, ("response_prompt", None, {"refreshed": False})),
+            (2, ("response", None, {})),
+        ],
+    )
+    report = flips.summarise()
+
+    assert report["dropped_frames"] == 0
+    assert report["frame_jitter_in_ms"] == pytest.approx(0, abs=1e-6)
+
+
+def test_last_screen_of_the_trial_is_reported_as_well():
+    flips = record(
+        [0.00, 0.01, 0.02, 0.04, 0.05],
+        [(0, ("ITI", 2, {})), (2, ("feedback", 3, {}))],
+    )
+    report = flips.summarise()
+
+    assert report["feedback_requested_in_ms"] == 30
+    assert report["feedback_measured_in_ms"] == 40
+    assert report["dropped_frames_feedback"] == 1
+
+
+def test_full_recorder_keeps_the_latest_flip():
+    # Room for 10 flips, 15 flips made
+    flips = record([n / 10 for n in range(15)], [], refresh_rate=10)
+
+    assert flips.n == 15
+    assert flips.times[-1] == pytest.approx(1.4)
+    assert len(flips.since(12)) == 0
+
+
+def test_full_recorder_reports_the_same_columns_as_a_normal_trial():
+    # Room for 10 flips, the stimulus only ends at flip 12
+    full = record(
+        [n / 10 for n in range(15)],
+        [(0, ("ITI", 2, {})), (2, ("stimulus", 10, {})), (12, ("cue", None, {}))],
+        refresh_rate=10,
+    ).summarise()
+    normal = record(
+        [n / 10 for n in range(5)],
+        [(0, ("ITI", 2, {})), (2, ("stimulus", 2, {})), (4, ("cue", None, {}))],
+        refresh_rate=10,
+    ).summarise()
+
+    assert list(full) == list(normal)
+    assert full["stimulus_requested_in_ms"] == 1000
+    assert math.isnan(full["stimulus_measured_in_ms"])
+    assert math.isnan(full["dropped_frames_stimulus"])
+
+
+def test_flips_starting_in_the_last_slot_have_no_shown_duration():
+    # Room for 10 flips, the response started on flip 9 and lasted until flip 12
+    flips = record([n / 10 for n in range(13)], [], refresh_rate=10)
+
+    assert len(flips.since(9)) == 0
+    assert math.isnan(get_shown_duration(flips.since(9), 4, 10))
+    assert get_shown_duration(flips.since(8), 5, 10) == pytest.approx(0.5)
+
+
+def test_shown_duration_includes_the_last_refresh():
+    assert get_shown_duration([1.00, 1.01, 1.02], 3, REFRESH_RATE) == pytest.approx(0.03)
+    assert get_shown_duration([], 0, REFRESH_RATE) == 0
+
+
+def test_shown_duration_without_timestamps_is_nan():
+    assert math.isnan(get_shown_duration([], 5, REFRESH_RATE))
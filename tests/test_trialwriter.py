@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+from background import BackgroundWorker
+from trialwriter import TrialWriter, write_together
+
+TRIALS = [
+    {"trial_number": n, "block": 1, "target_position": "left", "duration_diff": 12.5 * n,
+     "fixation_broken": n == 2}
+    for n in range(1, 21)
+]
+
+
+@pytest.fixture
+def worker():
+    return BackgroundWorker()
+
+
+def write(path, worker, trials, resume=False):
+    writer = TrialWriter(path, worker, resume=resume)
+    for trial in trials:
+        writer.write(trial)
+    writer.close()
+    return writer
+
+
+def test_file_is_the_same_as_from_pandas(tmp_path, worker):
+    write(tmp_path / "data.csv", worker, TRIALS)
+    pd.DataFrame(TRIALS).to_csv(tmp_path / "pandas.csv", index=False)
+
+    assert (tmp_path / "data.csv").read_bytes() == (tmp_path / "pandas.csv").read_bytes()
+
+
+def test_missing_values_are_written_like_pandas_does(tmp_path, worker):
+    row = {"trial_number": 1, "feedback_measured_in_ms": float("nan"), "response": None,
+           "duration_diff": 12.5}
+    write(tmp_path / "data.csv", worker, [row])
+    pd.DataFrame([row]).to_csv(tmp_path / "pandas.csv", index=False)
+
+    assert (tmp_path / "data.csv").read_bytes() == (tmp_path / "pandas.csv").read_bytes()
+
+
+def test_resuming_repairs_a_partly_written_trial(tmp_path, worker):
+    path = tmp_path / "data.csv"
+    write(path, worker, TRIALS[:12])
+    with open(path, "a") as file:
+        file.write("13,1,le")
+
+    writer = write(path, worker, TRIALS[12:], resume=True)
+    pd.DataFrame(TRIALS).to_csv(tmp_path / "pandas.csv", index=False)
+
+    assert writer.rows == 20
+    assert path.read_bytes() == (tmp_path / "pandas.csv").read_bytes()
+
+
+def test_resuming_without_a_file_starts_a_new_one(tmp_path, worker):
+    writer = write(tmp_path / "data.csv", worker, TRIALS[:3], resume=True)
+
+    assert writer.rows == 3
+    assert pd.read_csv(tmp_path / "data.csv").trial_number.tolist() == [1, 2, 3]
+
+
+def test_trial_with_a_new_column_raises_straight_away(tmp_path, worker):
+    writer = TrialWriter(tmp_path / "data.csv", worker)
+    writer.write(TRIALS[0])
+
+    with pytest.raises(Exception, match="extra"):
+        writer.write({**TRIALS[1], "extra": 1})
+
+    writer.write(TRIALS[1])
+    writer.close()
+    assert len(pd.read_csv(tmp_path / "data.csv")) == 2
+
+
+def test_rows_written_together_are_on_disk_before_the_next_task(tmp_path, worker):
+    data = TrialWriter(tmp_path / "data.csv", worker)
+    triggers = TrialWriter(tmp_path / "triggers.csv", worker)
+
+    write_together((triggers, [{"trial_number": 1, "event": "cue_onset"}]), (data, TRIALS[:1]))
+    worker.wait()
+
+    # Without closing either file
+    assert len(pd.read_csv(tmp_path / "data.csv")) == 1
+    assert len(pd.read_csv(tmp_path / "triggers.csv")) == 1
+    data.close()
+    triggers.close()
+
+
+def test_resuming_removes_rows_of_trials_that_were_not_saved(tmp_path, worker):
+    path = tmp_path / "triggers.csv"
+    write(path, worker, [{"trial_number": n, "event": event} for n in [1, 2, 3] for event in "ab"])
+
+    writer = TrialWriter(path, worker, resume=True, last_trial=2)
+    writer.close()
+
+    assert writer.rows == 4
+    assert pd.read_csv(path).trial_number.tolist() == [1, 1, 2, 2]
@@ -0,0 +1,129 @@
+"""
+This file contains the functions necessary for
+keeping track of when every frame was actually shown.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import numpy as np
+
+MAX_TRIAL_DURATION = 30  # in seconds, longest trial whose frames are all timestamped
+
+
+class FlipRecorder:
+    """
+    usage:
+
+       from timing import FlipRecorder
+
+    To initialise (done once, in get_settings):
+
+       flips = FlipRecorder(window, refresh_rate)
+
+    Then, for every trial:
+
+       flips.reset()
+       flips.start_screen("ITI", n_frames)
+       flips.flip()
+       ...
+       report = flips.summarise()
+    """
+
+    def __init__(self, window, refresh_rate, max_duration=MAX_TRIAL_DURATION) -> None:
+        self.window = window
+        self.refresh_rate = refresh_rate
+        self.times = np.zeros(max_duration * refresh_rate)
+        self.last_index = len(self.times) - 1
+        self.n = 0
+        self.screens = []
+
+    def reset(self):
+        self.n = 0
+        self.screens = []
+
+    def start_screen(self, name, n_frames=None, refreshed=True):
+        """
+        Mark that the next flip is the onset of screen `name`,
+        which is meant to be shown for `n_frames` refreshes (if known).
+        Screens that aren't `refreshed` every frame (e.g. while waiting for a key)
+        don't count towards the dropped frames and jitter of the trial.
+        """
+        self.screens.append((name, self.n, n_frames, refreshed))
+
+    def flip(self):
+        """
+        Flip the window and store when that happened. When the buffer is full,
+        the last entry keeps being overwritten so the latest flip is never lost.
+        """
+        flip_time = self.window.flip()
+        self.times[min(self.n, self.last_index)] = flip_time
+        self.n += 1
+
+        return flip_time
+
+    def since(self, index):
+        """
+        Timestamps of all flips from flip number `index` onwards, none if flip `index`
+        is in the last slot of the buffer or past it, as that slot only keeps the latest
+        flip, whose first one is then unknown.
+        """
+        if index >= self.last_index:
+            return self.times[:0]
+
+        return self.times[index : min(self.n, self.last_index + 1)]
+
+    def summarise(self):
+        """
+        Compare the measured duration of every screen with the requested one,
+        and count the dropped frames and timing jitter over the whole trial.
+        """
+        n = min(self.n, self.last_index + 1)
+        frame_duration = 1 / self.refresh_rate
+
+        # Every interval between flips should be a whole number of refreshes, ideally one,
+        # except on screens that weren't refreshed, which are left out
+        intervals = np.diff(self.times[:n])
+        ends = [start for _, start, *_ in self.screens[1:]] + [n]
+        for (_, start, _, refreshed), end in zip(self.screens, ends):
+            if not refreshed:
+                intervals[start:end] = np.nan
+
+        refreshes = np.rint(intervals * self.refresh_rate)
+        dropped = np.maximum(refreshes - 1, 0)
+
+        report = {}
+        for index, (name, start, n_frames, _) in enumerate(self.screens):
+            if n_frames is None:
+                continue
+
+            # A screen lasts until the next one starts, the last one of the trial until
+            # (at least) one refresh after its last flip, as for get_shown_duration
+            if index + 1 < len(self.screens):
+                end = self.screens[index + 1][1]
+                measured = self.times[end] - self.times[start] if end < n else np.nan
+            else:
+                end = self.n
+                measured = (
+                    self.times[end - 1] - self.times[start] + frame_duration
+                    if start < end <= n
+                    else np.nan
+                )
+
+            # Every trial has the same columns, so screens past the buffer are NaN
+            report[f"{name}_requested_in_ms"] = round(n_frames * frame_duration * 1000, 2)
+            report[f"{name}_measured_in_ms"] = (
+                np.nan if np.isnan(measured) else round(float(measured) * 1000, 2)
+            )
+            report[f"dropped_frames_{name}"] = (
+                np.nan if np.isnan(measured) else int(np.nansum(dropped[start:end]))
+            )
+
+        report["dropped_frames"] = int(np.nansum(dropped))
+        report["frame_jitter_in_ms"] = (
+            round(float(np.nanstd(intervals - refreshes * frame_duration)) * 1000, 3)
+            if np.any(~np.isnan(intervals))
+            else None
+        )
+
+        return report
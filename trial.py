@@ -7,9 +7,6 @@ To run the 'microsaccade bias duration' experiment, see main.py.
 made by Anna van Harmelen, 2025
 """
 
-from psychopy import visual
-from psychopy.core import wait
-from time import time, sleep
 from response import get_response, check_quit
 from stimuli import (
     show_text,
@@ -18,20 +15,26 @@ from stimuli import (
     create_cue_frame,
     create_feedback_frame,
 )
-from eyetracker import get_trigger
-import random
+from eyetracker import TriggerTable
+from fixation import FixationCheck
 
+# Screens during which the participant has to keep looking at the fixation dot
+FIXATION_SCREENS = ["stimulus_1", "stimulus_2", "cue"]
 
-def generate_trial_characteristics(conditions):
+
+def generate_trial_characteristics(conditions, rng):
     # Extract condition information
     target_item, positions, duration_order = conditions
 
     # Decide on random durations of stimuli
-    duration_dict = {"short": random.randint(200, 800), "long": random.randint(1000, 1600)}
+    duration_dict = {
+        "short": int(rng.integers(200, 801)),
+        "long": int(rng.integers(1000, 1601)),
+    }
     durations = (duration_dict[duration_order[0]], duration_dict[duration_order[1]])
 
     return {
-        "ITI": random.randint(500, 800),
+        "ITI": int(rng.integers(500, 801)),
         "target_item": target_item,
         "target_position": positions[0] if target_item == 1 else positions[1],
         "target_duration": durations[0] if target_item == 1 else durations[1],
@@ -42,15 +45,33 @@ def generate_trial_characteristics(conditions):
     }
 
 
-def do_while_showing(waiting_time, something_to_do, window):
+def duration_to_frames(duration, refresh_rate):
+    """
+    Convert a duration in seconds to the nearest whole number of screen refreshes.
+    """
+    return max(1, round(duration * refresh_rate))
+
+
+def show_for_frames(name, n_frames, draw, flips, on_onset=None, fixation=None):
     """
-    Show whatever is drawn to the screen for exactly `waiting_time` period,
-    while doing `something_to_do` in the mean time.
+    Show whatever `draw` puts on the screen for exactly `n_frames` refreshes,
+    calling `on_onset(flip_time)` right after the first of them has been flipped.
+    If a FixationCheck is given, fixation is checked after every flip
+    (or only after the last one, see FixationCheck).
     """
-    window.flip()
-    start = time()
-    something_to_do()
-    wait(waiting_time - (time() - start))
+    flips.start_screen(name, n_frames)
+    if fixation:
+        fixation.start()
+
+    for frame in range(n_frames):
+        draw()
+        flip_time = flips.flip()
+
+        if frame == 0 and on_onset:
+            on_onset(flip_time)
+
+        if fixation and (fixation.every_flip or frame == n_frames - 1):
+            fixation.check()
 
 
 def single_trial(
@@ -65,71 +86,93 @@ def single_trial(
     settings,
     testing,
     eyetracker=None,
+    bias_monitor=None,
+    triggers=None,
+    frames=None,
 ):
-    # Initial fixation cross to eliminate jitter caused by for loop
-    draw_fixation_dot(settings)
+    refresh_rate = settings["monitor"]["Hz"]
+    flips = settings["flips"]
+    flips.reset()
+    fixation = FixationCheck(eyetracker.gaze, settings) if eyetracker else None
+    triggers = triggers or TriggerTable(positions, duration_cats, target_item, settings["clock"])
+
+    def send_trigger(frame, flip_time):
+        if not testing:
+            triggers.send(frame, eyetracker, flip_time)
+
+        if frame == "cue_onset" and bias_monitor:
+            bias_monitor.cue(target_position)
 
     screens = [
-        (0, lambda: 0 / 0, None),  # initial one to make life easier
-        (ITI / 1000, lambda: draw_fixation_dot(settings), None),
+        ("ITI", ITI / 1000, lambda: draw_fixation_dot(settings), None),
         (
+            "stimulus_1",
             durations[0] / 1000,
             lambda: create_stimulus_frame(positions[0], 1, settings),
             "stimulus_onset_1",
         ),
-        (0.75, lambda: draw_fixation_dot(settings), None),
+        ("delay_1", 0.75, lambda: draw_fixation_dot(settings), None),
         (
+            "stimulus_2",
             durations[1] / 1000,
             lambda: create_stimulus_frame(positions[1], 2, settings),
             "stimulus_onset_2",
         ),
-        (0.75, lambda: draw_fixation_dot(settings), None),
-        (0.25, lambda: create_cue_frame(target_item, settings), "cue_onset"),
-        (1.00, lambda: draw_fixation_dot(settings), None),
+        ("delay_2", 0.75, lambda: draw_fixation_dot(settings), None),
+        ("cue", 0.25, lambda: create_cue_frame(target_item, settings), "cue_onset"),
+        ("retention", 1.00, lambda: draw_fixation_dot(settings), None),
     ]
 
-    # !!! The timing you pass to do_while_showing is the timing for the previously drawn screen. !!!
-    for index, (duration, _, frame) in enumerate(screens[:-1]):
-        # Send trigger if not testing
-        if not testing and frame:
-            trigger = get_trigger(frame, positions, duration_cats, target_item)
-            eyetracker.tracker.send_message(f"trig{trigger}")
-
+    # Show every screen for a whole number of refreshes (planned already for some),
+    # sending its trigger on its first flip
+    frames = frames or {}
+    for name, duration, draw, frame in screens:
         # Check for pressed 'q'
         check_quit(settings["keyboard"])
 
-        # Draw the next screen while showing the current one
-        do_while_showing(duration, screens[index + 1][1], settings["window"])
-
-    # The for loop only draws the last frame, never shows it
-    # So show it here
-    settings["window"].flip()
-    wait(screens[-1][0])
+        show_for_frames(
+            name,
+            frames.get(name) or duration_to_frames(duration, refresh_rate),
+            draw,
+            flips,
+            (lambda flip_time, frame=frame: send_trigger(frame, flip_time)) if frame else None,
+            fixation if name in FIXATION_SCREENS else None,
+        )
 
     response = get_response(
         target_duration,
-        positions,
-        duration_cats,
-        target_item,
+        triggers,
         settings,
         testing,
         eyetracker,
     )
 
     # Show performance (and feedback on premature key usage if necessary)
-    create_feedback_frame(target_duration, response["response_time_in_ms"], response["performance"], settings)
-
-    if response["premature_pressed"] == True:
-        show_text("!", settings["window"], (0, -settings["deg2pix"](0.3)))
-
-    if not testing:
-        trigger = get_trigger("feedback_onset", positions, duration_cats, target_item)
-        eyetracker.tracker.send_message(f"trig{trigger}")
+    def draw_feedback():
+        create_feedback_frame(
+            target_duration, response["response_time_in_ms"], response["performance"], settings
+        )
+
+        if response["premature_pressed"] == True:
+            show_text("!", settings, (0, -settings["deg2pix"](0.3)))
+
+    show_for_frames(
+        "feedback",
+        duration_to_frames(0.25, refresh_rate),
+        draw_feedback,
+        flips,
+        lambda flip_time: send_trigger("feedback_onset", flip_time),
+    )
 
-    settings["window"].flip()
-    sleep(0.25)
+    timing = flips.summarise()
+    if timing["dropped_frames"]:
+        settings["background"].log(
+            f"Warning: {timing['dropped_frames']} frame(s) dropped during this trial."
+        )
 
     return {
-        "condition_code": get_trigger("stimulus_onset_1", positions, duration_cats, target_item),
+        "condition_code": triggers.code("stimulus_onset_1"),
         **response,
+        **timing,
+        "fixation_broken": fixation.broken if fixation else False,
     }
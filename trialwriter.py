@@ -0,0 +1,183 @@
+"""
+This file contains the functions necessary for
+saving trial data to disk while the experiment is running.
+To run the 'microsaccade bias duration' experiment, see main.py.
+
+made by Anna van Harmelen, 2025
+"""
+
+import csv
+import math
+import os
+
+
+class TrialWriter:
+    """
+    usage:
+
+       from trialwriter import TrialWriter
+
+    To initialise:
+
+       writer = TrialWriter(path, settings["background"])
+
+    Then, after every trial:
+
+       writer.write(trial_data)
+
+    Or, for rows that belong together (e.g. a trial and its triggers):
+
+       write_together((trigger_writer, trigger_rows), (writer, [trial_data]))
+
+    And at the end of the session:
+
+       writer.close()
+
+    Rows are appended to the .csv by the background worker, which flushes them
+    to disk straight after, so a crash only loses the trials still queued.
+    The columns are those of the first trial, a later trial with another column raises
+    straight away. The finished file is the same as `pd.DataFrame(data).to_csv(path,
+    index=False)` for the data of this experiment: missing values (NaN or None) are left
+    empty, like pandas does, but other values are written as they are, so e.g. an int
+    column with a missing value gives 3 where pandas gives 3.0.
+    Passing `resume=True` continues a file left behind by an earlier crash,
+    `rows` being the number of rows in it. Rows with a trial_number after `last_trial`
+    are removed from it then (e.g. the triggers of trials whose data wasn't saved).
+    """
+
+    def __init__(self, path, worker, resume=False, last_trial=None) -> None:
+        self.path = path
+        self.worker = worker
+        self.fieldnames = None
+        self.rows = 0
+        self.unflushed = 0
+        self.error = None
+
+        if resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.fieldnames, self.rows = _repair_partial_file(path, last_trial)
+
+        self.file = open(path, "a" if self.fieldnames else "w", newline="")
+        self.writer = None
+        if self.fieldnames:
+            self.writer = self._create_writer(self.fieldnames)
+
+    def write(self, row: dict):
+        """
+        Queue one trial for writing, this returns immediately.
+        """
+        write_together((self, [row]))
+
+    def close(self):
+        """
+        Wait for all queued trials to be written and close the file.
+        """
+        self.worker.submit(self._flush)
+        self.worker.wait()
+        self.file.close()
+        self._raise_error()
+
+    def _create_writer(self, fieldnames):
+        return csv.DictWriter(self.file, fieldnames=fieldnames, lineterminator=os.linesep)
+
+    def _raise_error(self):
+        if self.error:
+            raise self.error
+
+    def _check(self, row):
+        self._raise_error()
+
+        if self.fieldnames is None:
+            self.fieldnames = list(row)
+
+        new_columns = [column for column in row if column not in self.fieldnames]
+        if new_columns:
+            raise Exception(
+                f"Expected only the columns {self.fieldnames} in trial {self.rows + 1}, "
+                f"but received {new_columns!r} as well."
+            )
+
+    def _append(self, rows):
+        if self.error or not rows:
+            return
+
+        try:
+            if self.writer is None:
+                self.writer = self._create_writer(self.fieldnames)
+                self.writer.writeheader()
+
+            self.writer.writerows(_without_missing(row) for row in rows)
+            self.unflushed += len(rows)
+        except Exception as e:
+            self.error = e
+
+    def _flush(self):
+        if self.unflushed and not self.error:
+            try:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.unflushed = 0
+            except Exception as e:
+                self.error = e
+
+
+def write_together(*writes):
+    """
+    Queue the rows for every (writer, rows) in `writes` as one task of the background
+    worker, in which they're written in this order and then flushed to disk, so a crash
+    can't save one without the others that came before it. This returns immediately.
+    """
+    for writer, rows in writes:
+        for row in rows:
+            writer._check(row)
+
+    def append():
+        for writer, rows in writes:
+            writer._append(rows)
+        for writer, _ in writes:
+            writer._flush()
+
+    writes[0][0].worker.submit(append)
+    for writer, rows in writes:
+        writer.rows += len(rows)
+
+
+def _repair_partial_file(path, last_trial=None):
+    """
+    Remove a row that was only partly written when the session crashed (and those
+    of trials after `last_trial`), and return the column names and the number of
+    complete rows in the file.
+    """
+    with open(path, "rb+") as file:
+        content = file.read()
+        file.truncate(content.rfind(b"\n") + 1)
+
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    if last_trial is not None:
+        kept = [row for row in rows if int(row["trial_number"]) <= last_trial]
+
+        if len(kept) < len(rows):
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=fieldnames, lineterminator=os.linesep)
+                writer.writeheader()
+                writer.writerows(_without_missing(row) for row in kept)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+            rows = kept
+
+    return fieldnames, len(rows)
+
+
+def _without_missing(row):
+    # Missing values are written as an empty field, like pandas does
+    return {
+        column: ""
+        if value is None or (isinstance(value, float) and math.isnan(value))
+        else value
+        for column, value in row.items()
+    }